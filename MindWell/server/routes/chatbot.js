@@ -372,12 +372,14 @@ router.get('/session/history/:sessionId', authMiddleware, async (req, res) => {
     const { sessionId } = req.params;
     const userId = req.user.userId;
 
-    // Call Python AI service to get session history
-    const response = await axios.get(`${AI_SERVICE_URL}/user/${userId}/history`, axiosConfig);
-
-    // Find the specific session
-    const sessions = response.data.sessions || [];
-    const session = sessions.find(s => s.session_id === sessionId);
+    // Call Python AI service to get this session (with messages)
+    let session;
+    try {
+      const response = await axios.get(`${AI_SERVICE_URL}/user/${userId}/history/${sessionId}`, axiosConfig);
+      session = response.data.session;
+    } catch (err) {
+      if (err.response?.status !== 404) throw err;
+    }
 
     if (!session) {
       return res.status(404).json({
@@ -433,12 +435,17 @@ router.get('/sessions', authMiddleware, async (req, res) => {
       });
     }
 
-    // Call Python AI service to get all user sessions
-    const response = await axios.get(`${AI_SERVICE_URL}/user/${userId}/history`, axiosConfig);
+    // Call Python AI service to get a page of user sessions (summary metadata only)
+    const { limit, cursor } = req.query;
+    const response = await axios.get(`${AI_SERVICE_URL}/user/${userId}/history`, {
+      ...axiosConfig,
+      params: { limit, cursor }
+    });
 
     res.status(200).json({
       success: true,
       sessions: response.data.sessions || [],
+      nextCursor: response.data.next_cursor || null,
       message: 'User sessions retrieved successfully',
       aiServiceAvailable: true
     });
@@ -1,5 +1,6 @@
 # agent_graph.py
 import os
+from types import MappingProxyType
 from typing import List, TypedDict, Optional, Literal, Dict, Any
 
 from dotenv import load_dotenv
@@ -12,7 +13,9 @@ from langgraph.checkpoint.memory import MemorySaver
 from tools.wikipedia_tool import search_wikipedia
 from tools.sentiment_tool import analyze_sentiment
 from tools.emotion_tool import analyze_emotion
+from tools import shadow_eval
 from tools.feature_recommender import recommend_features
+from tools.text_features import analyze_text, update_session_signals
 
 # Local memory
 from memory import memory_manager
@@ -43,19 +46,6 @@ LANG_MAP = {
     "pa": "Punjabi",
 }
 
-# -----------------------------
-# Safety / Risk
-# -----------------------------
-RISK_KEYWORDS = [
-    "suicide", "kill myself", "end my life", "want to die",
-    "hurt myself", "no reason to live", "cut myself", "self harm",
-    "self-harm", "harm myself", "die by suicide", "suicidal"
-]
-
-def risk_check(text: str) -> Literal["high", "low"]:
-    t = (text or "").lower()
-    return "high" if any(kw in t for kw in RISK_KEYWORDS) else "low"
-
 # -----------------------------
 # LLM Helpers
 # -----------------------------
@@ -67,15 +57,11 @@ def _call_llm(system_prompt: str, user_content: str) -> str:
     resp = llm(messages)
     return (resp.content or "").strip()
 
-def empathetic_reply(user_text: str, language: str = "en", conversation_context: str = "", emotion_data: dict = None, facial_emotion: dict = None) -> str:
+def empathetic_reply(user_text: str, language: str = "en", conversation_context: str = "", emotion_data: dict = None, facial_emotion: dict = None, text_features: dict = None) -> str:
     lang_name = LANG_MAP.get(language, "English")
     
     # Check if this is a personal question about conversation details
-    text_lower = user_text.lower()
-    is_personal_question = any(phrase in text_lower for phrase in [
-        "my name", "what's my name", "what is my name", "do you know my name",
-        "remember me", "do you remember", "what did i say", "what did i tell you"
-    ])
+    is_personal_question = (text_features or analyze_text(user_text))["conversation_question"]
     
     # Build context-aware prompt
     context_info = ""
@@ -136,251 +122,246 @@ def empathetic_reply(user_text: str, language: str = "en", conversation_context:
     full_user_content = user_text + context_info + emotion_context
     return _call_llm(system_prompt, full_user_content)
 
-def generate_recommendations(text_emotion: dict = None, facial_emotion: dict = None, user_text: str = "") -> List[Dict[str, Any]]:
-    """
-    Generate personalized recommendations based on combined text and facial emotion analysis.
-    Only generates recommendations if facial emotion is detected.
-    Returns a list of recommendation dictionaries with YouTube videos and blog links.
-    """
-    recommendations = []
-    
-    # Only generate recommendations if facial emotion is detected
-    if not facial_emotion or not facial_emotion.get("emotion"):
-        return recommendations  # Return empty if no facial emotion
-    
-    # Emotion mapping to activities, YouTube videos, and blog links
-    emotion_resources = {
-        "sad": {
-            "activities": ["Guided meditation", "Light walk", "Journaling", "Deep breathing"],
-            "youtube_videos": [
-                {
-                    "title": "10 Minute Meditation for Depression & Anxiety",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Guided meditation to help ease feelings of sadness"
-                },
-                {
-                    "title": "Calming Mood Lighting - Soft Warm Lights",
-                    "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
-                    "description": "Relaxing mood lighting video to create a peaceful atmosphere"
-                },
-                {
-                    "title": "Mood Boosting Music - Uplifting & Happy",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Calming music to help improve your mood"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Coping with Depression: 10 Tips",
-                    "url": "https://www.healthline.com/health/depression/how-to-fight-depression",
-                    "description": "Practical strategies for managing depression"
-                },
-                {
-                    "title": "Understanding and Managing Sadness",
-                    "url": "https://www.verywellmind.com/how-to-deal-with-sadness-3144590",
-                    "description": "Learn healthy ways to process and manage sadness"
-                }
-            ]
-        },
-        "sadness": {
-            "activities": ["Guided meditation", "Light walk", "Journaling", "Deep breathing"],
-            "youtube_videos": [
-                {
-                    "title": "10 Minute Meditation for Depression & Anxiety",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Guided meditation to help ease feelings of sadness"
-                },
-                {
-                    "title": "Mood Boosting Music - Uplifting & Happy",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Calming music to help improve your mood"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Coping with Depression: 10 Tips",
-                    "url": "https://www.healthline.com/health/depression/how-to-fight-depression",
-                    "description": "Practical strategies for managing depression"
-                }
-            ]
-        },
-        "happy": {
-            "activities": ["Gratitude practice", "Share positivity", "Social connection", "Continue joyful activities"],
-            "youtube_videos": [
-                {
-                    "title": "Warm Mood Lighting - Cozy Atmosphere",
-                    "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
-                    "description": "Beautiful warm lighting to maintain your positive mood"
-                },
-                {
-                    "title": "Morning Gratitude Practice",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Start your day with gratitude and positivity"
-                },
-                {
-                    "title": "Happy Mood Playlist - Upbeat Music",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Maintain your positive energy with uplifting music"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "How to Maintain Positive Mental Health",
-                    "url": "https://www.healthline.com/health/mental-health/how-to-maintain-positive-mental-health",
-                    "description": "Tips for sustaining positive mental wellbeing"
-                }
-            ]
-        },
-        "anger": {
-            "activities": ["Physical exercise", "Breathing exercises", "Stress-relief techniques", "Mindful walking"],
-            "youtube_videos": [
-                {
-                    "title": "Anger Management Meditation",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Meditation techniques to help manage anger"
-                },
-                {
-                    "title": "5 Minute Breathing Exercise for Anger",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Quick breathing exercises to calm anger"
-                },
-                {
-                    "title": "Yoga for Anger and Stress Relief",
-                    "url": "https://www.youtube.com/watch?v=hJbRpHZr_d0",
-                    "description": "Yoga poses to release tension and anger"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Anger Management: Tips and Techniques",
-                    "url": "https://www.healthline.com/health/anger-management",
-                    "description": "Effective strategies for managing anger"
-                },
-                {
-                    "title": "Understanding Anger and How to Control It",
-                    "url": "https://www.verywellmind.com/anger-management-strategies-4178870",
-                    "description": "Learn about anger and healthy coping mechanisms"
-                }
-            ]
-        },
-        "angry": {
-            "activities": ["Physical exercise", "Breathing exercises", "Stress-relief techniques", "Mindful walking"],
-            "youtube_videos": [
-                {
-                    "title": "Anger Management Meditation",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Meditation techniques to help manage anger"
-                },
-                {
-                    "title": "5 Minute Breathing Exercise for Anger",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Quick breathing exercises to calm anger"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Anger Management: Tips and Techniques",
-                    "url": "https://www.healthline.com/health/anger-management",
-                    "description": "Effective strategies for managing anger"
-                }
-            ]
-        },
-        "fear": {
-            "activities": ["Grounding exercises", "Deep breathing", "Progressive muscle relaxation", "Calming music"],
-            "youtube_videos": [
-                {
-                    "title": "Soothing Mood Lighting for Anxiety",
-                    "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
-                    "description": "Calming mood lighting to help reduce anxiety and fear"
-                },
-                {
-                    "title": "Grounding Techniques for Anxiety",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Learn grounding exercises to manage fear and anxiety"
-                },
-                {
-                    "title": "Calming Anxiety with Breathing Exercises",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Breathing techniques to calm fear and anxiety"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Coping with Anxiety and Fear",
-                    "url": "https://www.healthline.com/health/anxiety/how-to-cope-with-anxiety",
-                    "description": "Practical tips for managing anxiety and fear"
-                },
-                {
-                    "title": "Understanding Anxiety Disorders",
-                    "url": "https://www.verywellmind.com/anxiety-disorders-4157215",
-                    "description": "Learn about anxiety and effective treatment options"
-                }
-            ]
-        },
-        "anxiety": {
-            "activities": ["Grounding exercises", "Deep breathing", "Progressive muscle relaxation", "Calming music"],
-            "youtube_videos": [
-                {
-                    "title": "Grounding Techniques for Anxiety",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Learn grounding exercises to manage anxiety"
-                },
-                {
-                    "title": "Calming Anxiety with Breathing Exercises",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Breathing techniques to calm anxiety"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Coping with Anxiety and Fear",
-                    "url": "https://www.healthline.com/health/anxiety/how-to-cope-with-anxiety",
-                    "description": "Practical tips for managing anxiety"
-                }
-            ]
-        },
-        "neutral": {
-            "activities": ["Mindfulness meditation", "Gentle walk", "Gratitude practice", "Calming music"],
-            "youtube_videos": [
-                {
-                    "title": "Peaceful Mood Lighting - Ambient Atmosphere",
-                    "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
-                    "description": "Gentle mood lighting for a balanced, peaceful environment"
-                },
-                {
-                    "title": "10 Minute Mindfulness Meditation",
-                    "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
-                    "description": "Practice mindfulness for emotional balance"
-                },
-                {
-                    "title": "Calming Music for Relaxation",
-                    "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
-                    "description": "Peaceful music for relaxation and balance"
-                }
-            ],
-            "blog_links": [
-                {
-                    "title": "Mindfulness and Mental Health",
-                    "url": "https://www.healthline.com/health/mindfulness",
-                    "description": "Learn about the benefits of mindfulness practice"
-                }
-            ]
-        }
+# -----------------------------
+# Content recommendations
+# -----------------------------
+# Emotion mapping to activities, YouTube videos, and blog links
+EMOTION_RESOURCES = {
+    "sad": {
+        "activities": ["Guided meditation", "Light walk", "Journaling", "Deep breathing"],
+        "youtube_videos": [
+            {
+                "title": "10 Minute Meditation for Depression & Anxiety",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Guided meditation to help ease feelings of sadness"
+            },
+            {
+                "title": "Calming Mood Lighting - Soft Warm Lights",
+                "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
+                "description": "Relaxing mood lighting video to create a peaceful atmosphere"
+            },
+            {
+                "title": "Mood Boosting Music - Uplifting & Happy",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Calming music to help improve your mood"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Coping with Depression: 10 Tips",
+                "url": "https://www.healthline.com/health/depression/how-to-fight-depression",
+                "description": "Practical strategies for managing depression"
+            },
+            {
+                "title": "Understanding and Managing Sadness",
+                "url": "https://www.verywellmind.com/how-to-deal-with-sadness-3144590",
+                "description": "Learn healthy ways to process and manage sadness"
+            }
+        ]
+    },
+    "sadness": {
+        "activities": ["Guided meditation", "Light walk", "Journaling", "Deep breathing"],
+        "youtube_videos": [
+            {
+                "title": "10 Minute Meditation for Depression & Anxiety",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Guided meditation to help ease feelings of sadness"
+            },
+            {
+                "title": "Mood Boosting Music - Uplifting & Happy",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Calming music to help improve your mood"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Coping with Depression: 10 Tips",
+                "url": "https://www.healthline.com/health/depression/how-to-fight-depression",
+                "description": "Practical strategies for managing depression"
+            }
+        ]
+    },
+    "happy": {
+        "activities": ["Gratitude practice", "Share positivity", "Social connection", "Continue joyful activities"],
+        "youtube_videos": [
+            {
+                "title": "Warm Mood Lighting - Cozy Atmosphere",
+                "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
+                "description": "Beautiful warm lighting to maintain your positive mood"
+            },
+            {
+                "title": "Morning Gratitude Practice",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Start your day with gratitude and positivity"
+            },
+            {
+                "title": "Happy Mood Playlist - Upbeat Music",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Maintain your positive energy with uplifting music"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "How to Maintain Positive Mental Health",
+                "url": "https://www.healthline.com/health/mental-health/how-to-maintain-positive-mental-health",
+                "description": "Tips for sustaining positive mental wellbeing"
+            }
+        ]
+    },
+    "anger": {
+        "activities": ["Physical exercise", "Breathing exercises", "Stress-relief techniques", "Mindful walking"],
+        "youtube_videos": [
+            {
+                "title": "Anger Management Meditation",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Meditation techniques to help manage anger"
+            },
+            {
+                "title": "5 Minute Breathing Exercise for Anger",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Quick breathing exercises to calm anger"
+            },
+            {
+                "title": "Yoga for Anger and Stress Relief",
+                "url": "https://www.youtube.com/watch?v=hJbRpHZr_d0",
+                "description": "Yoga poses to release tension and anger"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Anger Management: Tips and Techniques",
+                "url": "https://www.healthline.com/health/anger-management",
+                "description": "Effective strategies for managing anger"
+            },
+            {
+                "title": "Understanding Anger and How to Control It",
+                "url": "https://www.verywellmind.com/anger-management-strategies-4178870",
+                "description": "Learn about anger and healthy coping mechanisms"
+            }
+        ]
+    },
+    "angry": {
+        "activities": ["Physical exercise", "Breathing exercises", "Stress-relief techniques", "Mindful walking"],
+        "youtube_videos": [
+            {
+                "title": "Anger Management Meditation",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Meditation techniques to help manage anger"
+            },
+            {
+                "title": "5 Minute Breathing Exercise for Anger",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Quick breathing exercises to calm anger"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Anger Management: Tips and Techniques",
+                "url": "https://www.healthline.com/health/anger-management",
+                "description": "Effective strategies for managing anger"
+            }
+        ]
+    },
+    "fear": {
+        "activities": ["Grounding exercises", "Deep breathing", "Progressive muscle relaxation", "Calming music"],
+        "youtube_videos": [
+            {
+                "title": "Soothing Mood Lighting for Anxiety",
+                "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
+                "description": "Calming mood lighting to help reduce anxiety and fear"
+            },
+            {
+                "title": "Grounding Techniques for Anxiety",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Learn grounding exercises to manage fear and anxiety"
+            },
+            {
+                "title": "Calming Anxiety with Breathing Exercises",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Breathing techniques to calm fear and anxiety"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Coping with Anxiety and Fear",
+                "url": "https://www.healthline.com/health/anxiety/how-to-cope-with-anxiety",
+                "description": "Practical tips for managing anxiety and fear"
+            },
+            {
+                "title": "Understanding Anxiety Disorders",
+                "url": "https://www.verywellmind.com/anxiety-disorders-4157215",
+                "description": "Learn about anxiety and effective treatment options"
+            }
+        ]
+    },
+    "anxiety": {
+        "activities": ["Grounding exercises", "Deep breathing", "Progressive muscle relaxation", "Calming music"],
+        "youtube_videos": [
+            {
+                "title": "Grounding Techniques for Anxiety",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Learn grounding exercises to manage anxiety"
+            },
+            {
+                "title": "Calming Anxiety with Breathing Exercises",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Breathing techniques to calm anxiety"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Coping with Anxiety and Fear",
+                "url": "https://www.healthline.com/health/anxiety/how-to-cope-with-anxiety",
+                "description": "Practical tips for managing anxiety"
+            }
+        ]
+    },
+    "neutral": {
+        "activities": ["Mindfulness meditation", "Gentle walk", "Gratitude practice", "Calming music"],
+        "youtube_videos": [
+            {
+                "title": "Peaceful Mood Lighting - Ambient Atmosphere",
+                "url": "https://www.youtube.com/watch?v=jfKfPfyJRdk",
+                "description": "Gentle mood lighting for a balanced, peaceful environment"
+            },
+            {
+                "title": "10 Minute Mindfulness Meditation",
+                "url": "https://www.youtube.com/watch?v=ZToicYcHIOU",
+                "description": "Practice mindfulness for emotional balance"
+            },
+            {
+                "title": "Calming Music for Relaxation",
+                "url": "https://www.youtube.com/watch?v=4zLfCnGVeL4",
+                "description": "Peaceful music for relaxation and balance"
+            }
+        ],
+        "blog_links": [
+            {
+                "title": "Mindfulness and Mental Health",
+                "url": "https://www.healthline.com/health/mindfulness",
+                "description": "Learn about the benefits of mindfulness practice"
+            }
+        ]
     }
-    
-    # Get primary emotion from facial emotion (required for recommendations)
-    primary_emotion = facial_emotion.get("emotion", "").lower()
-    mood_score = facial_emotion.get("mood", 5)
-    confidence = facial_emotion.get("confidence", 0.5)
-    
-    # Get resources for this emotion
-    emotion_data = emotion_resources.get(primary_emotion, emotion_resources["neutral"])
-    activities = emotion_data.get("activities", [])
-    youtube_videos = emotion_data.get("youtube_videos", [])
-    blog_links = emotion_data.get("blog_links", [])
+}
+
+CRISIS_RESOURCE = {
+    "type": "resource",
+    "title": "Crisis Support Resources",
+    "description": "If you're in immediate distress, please reach out to crisis helplines or trusted support",
+    "url": "https://www.crisistextline.org/",
+    "priority": 5
+}
+
+
+def _build_recommendations(resources: dict, low_mood: bool, high_risk: bool) -> List[Dict[str, Any]]:
+    recommendations = []
+    activities = resources.get("activities", [])
+    youtube_videos = resources.get("youtube_videos", [])
+    blog_links = resources.get("blog_links", [])
     
     # Add activities (limit based on mood)
-    if mood_score <= 3:
+    if low_mood:
         # Low mood - focus on support and self-care
         for i, activity in enumerate(activities[:2], 1):
             recommendations.append({
@@ -406,7 +387,7 @@ def generate_recommendations(text_emotion: dict = None, facial_emotion: dict = N
             "title": video["title"],
             "description": video["description"],
             "url": video["url"],
-            "priority": 4 if mood_score <= 3 else 3
+            "priority": 4 if low_mood else 3
         })
     
     # Add blog links (1-2 links)
@@ -420,20 +401,46 @@ def generate_recommendations(text_emotion: dict = None, facial_emotion: dict = N
         })
     
     # Add crisis resources for high-risk situations
-    if text_emotion and text_emotion.get("risk") == "high":
-        recommendations.append({
-            "type": "resource",
-            "title": "Crisis Support Resources",
-            "description": "If you're in immediate distress, please reach out to crisis helplines or trusted support",
-            "url": "https://www.crisistextline.org/",
-            "priority": 5
-        })
+    if high_risk:
+        recommendations.append(dict(CRISIS_RESOURCE))
     
     # Sort by priority (higher priority first)
     recommendations.sort(key=lambda x: x.get("priority", 3), reverse=True)
     
     return recommendations[:8]  # Return top 8 recommendations
 
+
+# The result only depends on (emotion, low mood, high risk), so every
+# combination is built once here; the shared items are read-only and
+# generate_recommendations hands out copies.
+_RECOMMENDATION_TABLES = {
+    (emotion, low_mood, high_risk): tuple(
+        MappingProxyType(item) for item in _build_recommendations(resources, low_mood, high_risk)
+    )
+    for emotion, resources in EMOTION_RESOURCES.items()
+    for low_mood in (False, True)
+    for high_risk in (False, True)
+}
+
+
+def generate_recommendations(text_emotion: dict = None, facial_emotion: dict = None, user_text: str = "") -> List[Dict[str, Any]]:
+    """
+    Generate personalized recommendations based on combined text and facial emotion analysis.
+    Only generates recommendations if facial emotion is detected.
+    Returns a list of recommendation dictionaries with YouTube videos and blog links.
+    """
+    # Only generate recommendations if facial emotion is detected
+    if not facial_emotion or not facial_emotion.get("emotion"):
+        return []  # Return empty if no facial emotion
+    
+    # Get primary emotion from facial emotion (required for recommendations)
+    primary_emotion = facial_emotion.get("emotion", "").lower()
+    if primary_emotion not in EMOTION_RESOURCES:
+        primary_emotion = "neutral"
+    low_mood = facial_emotion.get("mood", 5) <= 3
+    high_risk = bool(text_emotion) and text_emotion.get("risk") == "high"
+    return [dict(item) for item in _RECOMMENDATION_TABLES[(primary_emotion, low_mood, high_risk)]]
+
 def next_question(history: List[Dict[str, str]], language: str = "en") -> str:
     lang_name = LANG_MAP.get(language, "English")
     # ✅ normalize "text" / "content"
@@ -502,6 +509,8 @@ class AgentState(TypedDict):
     input_text: str
     messages: List[Dict[str, str]]
     risk: Literal["high", "low"]
+    text_features: Optional[Dict[str, Any]]  # tools/text_features.analyze_text of input_text
+    session_signals: Optional[Dict[str, Any]]  # topic/risk counters over recent user messages
     sentiment: Optional[Dict[str, Any]]
     emotion: Optional[Dict[str, Any]]  # Text-based emotion analysis
     facial_emotion: Optional[Dict[str, Any]]  # Facial emotion data
@@ -531,6 +540,8 @@ def node_init(state: AgentState) -> AgentState:
     
     state.setdefault("language", "en")
     state.setdefault("risk", "low")
+    state.setdefault("text_features", None)
+    state.setdefault("session_signals", None)
     state.setdefault("sentiment", None)
     state.setdefault("emotion", None)
     state.setdefault("facial_emotion", None)
@@ -541,23 +552,42 @@ def node_init(state: AgentState) -> AgentState:
     state.setdefault("recommendations", None)
     return state
 
+def _text_features(state: AgentState) -> Dict[str, Any]:
+    """Features of the current input, computing them if analyze_text hasn't run yet."""
+    features = state.get("text_features")
+    if features is None:
+        features = state["text_features"] = analyze_text(state.get("input_text", "") or "")
+    return features
+
+def node_analyze_text(state: AgentState) -> AgentState:
+    """Normalize and scan the user text once; later nodes read state["text_features"]"""
+    text = state.get("input_text", "") or ""
+    state["text_features"] = analyze_text(text)
+    # Only the newest message is folded into the session counters
+    if text.strip():
+        state["session_signals"] = update_session_signals(state.get("session_signals"), state["text_features"])
+    return state
+
 def node_risk_check(state: AgentState) -> AgentState:
-    state["risk"] = risk_check(state.get("input_text", "") or "")
+    state["risk"] = _text_features(state)["risk"]
     return state
 
 def node_sentiment(state: AgentState) -> AgentState:
-    text = state.get("input_text", "") or ""
-    if text.strip():
-        state["sentiment"] = analyze_sentiment(text)
+    normalized = _text_features(state)["normalized"]
+    if normalized:
+        state["sentiment"] = analyze_sentiment(normalized, normalized=True)
     return state
 
 def node_emotion(state: AgentState) -> AgentState:
     """Analyze emotion using the trained ML model"""
     text = state.get("input_text", "") or ""
-    if text.strip():
+    normalized = _text_features(state)["normalized"]
+    if normalized:
         try:
-            emotion_data = analyze_emotion(text)
+            emotion_data = analyze_emotion(normalized, normalized=True)
             state["emotion"] = emotion_data
+            # Candidate models re-score a sample in the background (never blocks)
+            shadow_eval.submit(text, emotion_data)
             
             # Update risk level based on emotion analysis
             emotion_risk = emotion_data.get("risk", "low")
@@ -598,21 +628,14 @@ def node_router(state: AgentState) -> AgentState:
     return state
 
 def route_reply_or_knowledge(state: AgentState) -> str:
-    text = (state.get("input_text") or "").lower()
+    features = _text_features(state)
     
     # Check for personal questions first (should use conversation context)
-    personal_questions = [
-        "my name", "what's my name", "what is my name", "do you know my name",
-        "remember me", "do you remember", "what did i say", "what did i tell you",
-        "my age", "my job", "my work", "my family", "my friends",
-        "how am i feeling", "what am i feeling", "my mood", "my emotions"
-    ]
-    
-    if any(phrase in text for phrase in personal_questions):
+    if features["personal_question"]:
         return "normal"  # Use conversation context instead of knowledge lookup
     
     # Check for general knowledge questions
-    if any(keyword in text for keyword in ["what is", "explain", "research", "study", "who is", "information"]):
+    if features["knowledge_query"]:
         return "knowledge"
     
     return "normal"
@@ -645,14 +668,12 @@ def node_empathetic_reply(state: AgentState) -> AgentState:
     # Generate all types of recommendations
     recommendations = []
     
+    # Help indicators / risk phrases in the recent user messages (O(1) counter lookups)
+    text_features = _text_features(state)
+    signals = state.get("session_signals") or update_session_signals(None, text_features)
+    
     # 1. Check if therapist recommendation is needed (highest priority)
-    text_lower = text.lower()
-    context_lower = conversation_context.lower()
-    needs_professional = any(indicator in text_lower or indicator in context_lower for indicator in [
-        "therapist", "counselor", "doctor", "professional", "help", "support",
-        "can't cope", "struggling", "need help", "don't know what to do",
-        "suicidal", "harm", "crisis", "emergency"
-    ])
+    needs_professional = "professional" in signals["counts"] or "risk" in signals["counts"]
     
     risk_level = state.get("risk", "low")
     if needs_professional or risk_level in ["medium", "high"] or (emotion_data and emotion_data.get("risk") in ["medium", "high"]):
@@ -668,7 +689,8 @@ def node_empathetic_reply(state: AgentState) -> AgentState:
         recommendations.append(therapist_recommendation)
     
     # 2. Generate MindWell feature recommendations (limit to 1-2 based on whether therapist is included)
-    feature_recommendations = recommend_features(text, emotion_data, conversation_context)
+    feature_recommendations = recommend_features(text, emotion_data, conversation_context,
+                                                 text_features=text_features, session_signals=signals)
     max_features = 2 if not recommendations else 1  # If therapist is included, only 1 feature
     recommendations.extend(feature_recommendations[:max_features])
     
@@ -683,7 +705,7 @@ def node_empathetic_reply(state: AgentState) -> AgentState:
     recommendations.sort(key=lambda x: x.get("priority", 3), reverse=True)
     state["recommendations"] = recommendations[:2] if recommendations else None
     
-    reply = empathetic_reply(text, lang, conversation_context, emotion_data, facial_emotion_data)
+    reply = empathetic_reply(text, lang, conversation_context, emotion_data, facial_emotion_data, text_features)
     state["reply"] = reply
     
     # Add assistant reply to messages (LangGraph checkpointer will persist this)
@@ -716,8 +738,7 @@ def route_after_risk(state: AgentState) -> str:
     return "crisis" if state.get("risk") == "high" else "ok"
 
 def route_continue_or_end(state: AgentState) -> str:
-    text = (state.get("input_text") or "").strip().lower()
-    if text in {"end", "finish", "stop", "done"}:
+    if _text_features(state)["end_command"]:
         return "end"
     assistant_turns = sum(1 for m in state["messages"] if m["role"] == "assistant")
     return "end" if assistant_turns >= 8 else "continue"
@@ -729,6 +750,7 @@ def build_graph() -> StateGraph:
     graph = StateGraph(AgentState)
 
     graph.add_node("init", node_init)
+    graph.add_node("analyze_text", node_analyze_text)
     graph.add_node("risk_check", node_risk_check)
     graph.add_node("analyze_sentiment", node_sentiment)
     graph.add_node("analyze_emotion", node_emotion)
@@ -740,7 +762,8 @@ def build_graph() -> StateGraph:
     graph.add_node("summarize", node_summarize)
 
     graph.set_entry_point("init")
-    graph.add_edge("init", "risk_check")
+    graph.add_edge("init", "analyze_text")
+    graph.add_edge("analyze_text", "risk_check")
     graph.add_edge("risk_check", "analyze_sentiment")
     graph.add_edge("analyze_sentiment", "analyze_emotion")
 
@@ -791,10 +814,13 @@ def run_agent_step(
         if existing_state and existing_state.values:
             # Load existing messages from checkpointer
             existing_messages = existing_state.values.get("messages", [])
+            existing_signals = existing_state.values.get("session_signals")
         else:
             existing_messages = []
+            existing_signals = None
     except Exception:
         existing_messages = []
+        existing_signals = None
 
     state: AgentState = {
         "user_id": user_id,
@@ -803,6 +829,8 @@ def run_agent_step(
         "input_text": user_text,
         "messages": existing_messages,  # Load existing conversation
         "risk": "low",
+        "text_features": None,
+        "session_signals": existing_signals,  # counters carried across turns like messages
         "sentiment": None,
         "emotion": None,
         "facial_emotion": facial_emotion,  # Add facial emotion to state
@@ -1,20 +1,93 @@
 # database.py
 import os
-from datetime import datetime
-from pymongo import MongoClient
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from repository import (
+    create_repository, new_message,
+    DEFAULT_HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE,
+)
+
 load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = "mindcare_ai"
+# --- Storage Backend ---
+# DB_BACKEND picks the Repository behind these functions: "mongo" (default)
+# or "memory" for Mongo-free runs and benchmarks (see repository.py).
+# Nothing connects at import time; the backend is built on first use.
+_repository = None
+_repository_lock = threading.Lock()
+
+def get_repository():
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = create_repository()
+    return _repository
+
+def set_repository(repository):
+    """Swap the storage backend (e.g. an InMemoryRepository in a benchmark)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository
+    user_cache.clear()
+
+def ensure_indexes():
+    """Create any missing indexes for the active backend (no-op in memory)."""
+    return get_repository().ensure_indexes()
+
+# --- User Cache ---
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 1024))
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry TTL and LRU eviction.
+    Entries are per worker process; writes made through this module store
+    the updated document (write-through), and the TTL bounds staleness from
+    other workers.
+    """
+
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+    def clear(self):
+        with self._lock:
+            self._data.clear()
 
-# --- Collections ---
-users_col = db["users"]
-sessions_col = db["sessions"]
+user_cache = TTLCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
 
 # --- User Functions ---
 def create_user(user_id, email=None, consent_email=False, language="en"):
@@ -22,26 +95,37 @@ def create_user(user_id, email=None, consent_email=False, language="en"):
     Create a new user with optional email, consent flag, and language preference.
     Default language = English ("en").
     """
-    if not users_col.find_one({"_id": user_id}):
-        users_col.insert_one({
-            "_id": user_id,
-            "email": email,
-            "consent_email": consent_email,
-            "language": language,
-            "created_at": datetime.utcnow()
-        })
+    user = get_repository().insert_user_if_missing({
+        "_id": user_id,
+        "email": email,
+        "consent_email": consent_email,
+        "language": language,
+        "created_at": datetime.utcnow()
+    })
+    _cache_user(user_id, user)
+
+def _cache_user(user_id, user):
+    """Write-through: cache the document a write returned (None evicts)."""
+    if user is None:
+        user_cache.invalidate(user_id)
+    else:
+        user_cache.set(user_id, user)
 
 def get_user(user_id):
-    return users_col.find_one({"_id": user_id})
+    """Read-through cached user lookup (see USER_CACHE_TTL_SECONDS)."""
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_repository().find_user(user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+    # Hand out copies so callers can't mutate the cached document
+    return dict(user) if user is not None else None
 
 def update_user_language(user_id, language):
     """
     Update user's preferred language (e.g., 'en', 'hi', 'ta', 'bn').
     """
-    users_col.update_one(
-        {"_id": user_id},
-        {"$set": {"language": language}}
-    )
+    _cache_user(user_id, get_repository().update_user(user_id, {"language": language}))
 
 def update_user_email_consent(user_id, email=None, consent_email=None):
     """
@@ -54,48 +138,139 @@ def update_user_email_consent(user_id, email=None, consent_email=None):
         update_data["consent_email"] = consent_email
     
     if update_data:
-        users_col.update_one(
-            {"_id": user_id},
-            {"$set": update_data}
-        )
+        _cache_user(user_id, get_repository().update_user(user_id, update_data))
 
 # --- Session Functions ---
-def create_session(session_id, user_id, custom_email=None):
-    sessions_col.insert_one({
+def create_session(session_id, user_id, custom_email=None, initial_messages=None):
+    """
+    Insert a new session. initial_messages is an optional list of
+    (role, text) pairs stored with it (e.g. the opening line).
+    """
+    messages = [new_message(role, text) for role, text in (initial_messages or [])]
+    get_repository().insert_session({
         "_id": session_id,
         "user_id": user_id,
         "custom_email": custom_email,  # Store custom email for this session
-        "messages": [],
         "summary": None,
         "risk": None,
         "emailed": False,
         "created_at": datetime.utcnow()
-    })
+    }, messages)
 
 def add_message(session_id, role, text):
-    sessions_col.update_one(
-        {"_id": session_id},
-        {"$push": {"messages": {
-            "role": role,
-            "text": text,
-            "ts": datetime.utcnow()
-        }}}
-    )
+    get_repository().append_messages(session_id, [new_message(role, text)])
 
 def save_summary(session_id, summary, risk):
-    sessions_col.update_one(
-        {"_id": session_id},
-        {"$set": {"summary": summary, "risk": risk}}
-    )
+    get_repository().update_session(session_id, {"summary": summary, "risk": risk})
 
 def mark_emailed(session_id):
-    sessions_col.update_one(
-        {"_id": session_id},
-        {"$set": {"emailed": True}}
-    )
+    get_repository().update_session(session_id, {"emailed": True})
+
+def get_session(session_id, fields=None):
+    """
+    Fetch a session. Pass `fields` (list of field names) to fetch only those,
+    e.g. when the caller just needs to check the session exists.
+    """
+    return get_repository().find_session(session_id, fields)
+
+def get_session_messages(session_id, start=0, end=None):
+    """
+    Messages with seq in [start, end) (end=None → to the last message),
+    reading only the storage buckets that cover that range.
+    """
+    return get_repository().find_session_messages(session_id, start, end)
+
+# --- Per-turn unit of work ---
+class SessionTurn:
+    """
+    Collects every write one request makes to a session and flushes them
+    together on commit: the session update (seq reservation + $set fields)
+    and the message bucket writes. Pass the message_count the request
+    already read with get_session and both go out in one round trip (see
+    Repository.append_messages).
+
+    Usage:
+        with SessionTurn(session_id) as turn:
+            turn.add_message("user", text)
+            turn.add_message("assistant", reply)
+            turn.save_summary(summary, risk)
+        # committed on exit
+    """
+
+    def __init__(self, session_id, message_count=None):
+        self.session_id = session_id
+        self.message_count = message_count
+        self._messages = []
+        self._fields = {}
+
+    def add_message(self, role, text):
+        self._messages.append(new_message(role, text))
+
+    def save_summary(self, summary, risk):
+        self._fields.update({"summary": summary, "risk": risk})
+
+    def mark_emailed(self):
+        self._fields["emailed"] = True
 
-def get_session(session_id):
-    return sessions_col.find_one({"_id": session_id})
+    def pending(self):
+        """The gathered (messages, fields) not yet committed."""
+        return list(self._messages), dict(self._fields)
 
-def get_user_sessions(user_id):
-    return list(sessions_col.find({"user_id": user_id}))
+    def clear(self):
+        self._messages = []
+        self._fields = {}
+
+    def commit(self):
+        """Flush pending changes; no-op if nothing changed."""
+        messages, fields = self.pending()
+        if messages:
+            get_repository().append_messages(self.session_id, messages, fields, start_seq=self.message_count)
+            # Unknown if a concurrent writer made it reserve other seqs
+            self.message_count = None
+        elif fields:
+            get_repository().update_session(self.session_id, fields)
+        self.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Persist whatever the turn gathered even if a later step failed,
+        # matching the old write-as-you-go behaviour.
+        self.commit()
+        return False
+
+# --- History (paginated) ---
+def get_user_sessions(user_id, limit=DEFAULT_HISTORY_PAGE_SIZE, cursor=None, include_archived=False):
+    """
+    One page of a user's sessions, newest first, without message bodies.
+    Returns (sessions, next_cursor); next_cursor is None on the last page.
+    Archived sessions are only listed with include_archived=True.
+    Raises ValueError for a malformed cursor.
+    """
+    return get_repository().find_user_sessions(user_id, limit, cursor, include_archived=include_archived)
+
+def get_user_session(user_id, session_id, include_messages=True):
+    """A single session owned by user_id (live or archived), optionally with its full messages."""
+    return get_repository().find_user_session(user_id, session_id, include_messages)
+
+# --- Archival ---
+# Sessions idle past these limits move to a cold archive collection so the
+# hot sessions/session_messages working set stays small.
+ARCHIVE_FINISHED_AFTER_DAYS = float(os.getenv("ARCHIVE_FINISHED_AFTER_DAYS", 30))
+ARCHIVE_ABANDONED_AFTER_HOURS = float(os.getenv("ARCHIVE_ABANDONED_AFTER_HOURS", 24))
+
+def archive_stale_sessions(finished_days=None, abandoned_hours=None):
+    """
+    Archive finished sessions idle for `finished_days` and never-finished
+    ones idle for `abandoned_hours`. Returns the number of sessions moved.
+    """
+    if finished_days is None:
+        finished_days = ARCHIVE_FINISHED_AFTER_DAYS
+    if abandoned_hours is None:
+        abandoned_hours = ARCHIVE_ABANDONED_AFTER_HOURS
+    now = datetime.utcnow()
+    return get_repository().archive_sessions(
+        finished_before=now - timedelta(days=finished_days),
+        abandoned_before=now - timedelta(hours=abandoned_hours),
+    )
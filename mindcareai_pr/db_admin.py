@@ -0,0 +1,139 @@
+# db_admin.py
+"""
+Database maintenance / diagnostics commands.
+
+Usage:
+    python db_admin.py ensure-indexes
+    python db_admin.py explain [--user-id U] [--session-id S]
+    python db_admin.py archive [--finished-days D] [--abandoned-hours H]
+
+`explain` prints the query plan of every query database.py issues, so a
+missing index (COLLSCAN) shows up before it shows up in latency graphs.
+
+`archive` moves stale sessions to sessions_archive (defaults come from
+ARCHIVE_FINISHED_AFTER_DAYS / ARCHIVE_ABANDONED_AFTER_HOURS); run it from cron.
+"""
+import sys
+import argparse
+import json
+from datetime import datetime
+
+from database import get_repository, ensure_indexes, archive_stale_sessions
+from mongo_repository import MongoRepository, stale_sessions_query
+
+
+def _query_catalog(repo, user_id, session_id):
+    """
+    Every query shape database.py sends to Mongo, as
+    (name, collection, explain command body).
+    """
+    users_col, sessions_col, messages_col = repo.users_col, repo.sessions_col, repo.messages_col
+    now = datetime.utcnow()
+    return [
+        ("get_user / create_user", users_col,
+         {"find": "users", "filter": {"_id": user_id}, "limit": 1}),
+        ("update_user_language / update_user_email_consent", users_col,
+         {"findAndModify": "users", "query": {"_id": user_id}, "update": {"$set": {"language": "en"}}, "new": True}),
+        ("get_session", sessions_col,
+         {"find": "sessions", "filter": {"_id": session_id}, "limit": 1}),
+        ("add_message / SessionTurn.commit: reserve seq", sessions_col,
+         {"findAndModify": "sessions", "query": {"_id": session_id}, "update": {"$inc": {"message_count": 0}}}),
+        ("add_message / SessionTurn.commit: append to bucket", messages_col,
+         {"update": "session_messages", "updates": [{"q": {"session_id": session_id, "bucket": 0},
+                                                      "u": {"$inc": {"count": 0}}, "upsert": True}]}),
+        ("get_session_messages", messages_col,
+         {"find": "session_messages", "filter": {"session_id": session_id, "bucket": {"$gte": 0}},
+          "sort": {"bucket": 1}}),
+        ("save_summary / mark_emailed", sessions_col,
+         {"update": "sessions", "updates": [{"q": {"_id": session_id}, "u": {"$set": {"emailed": True}}}]}),
+        ("get_user_sessions", sessions_col,
+         {"find": "sessions", "filter": {"user_id": user_id}, "sort": {"created_at": -1, "_id": -1}, "limit": 21}),
+        ("admin: unsent summaries", sessions_col,
+         {"find": "sessions", "filter": {"emailed": False}, "sort": {"created_at": -1}}),
+        ("admin: high-risk sessions", sessions_col,
+         {"find": "sessions", "filter": {"risk": "high"}, "sort": {"created_at": -1}}),
+        ("archive_stale_sessions", sessions_col,
+         {"find": "sessions", "filter": stale_sessions_query(now, now), "limit": 200}),
+        ("get_user_sessions(include_archived=True)", repo.archive_col,
+         {"find": "sessions_archive", "filter": {"user_id": user_id}, "sort": {"created_at": -1, "_id": -1}, "limit": 21}),
+    ]
+
+
+def _plan_stages(plan):
+    """Flatten a winningPlan tree into 'STAGE(index)' strings, root first."""
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def explain_queries(user_id=None, session_id=None):
+    repo = get_repository()
+    if not isinstance(repo, MongoRepository):
+        sys.exit("explain needs the Mongo backend (DB_BACKEND=mongo)")
+    sessions_col = repo.sessions_col
+
+    # Default to real ids so the plans reflect actual data distribution
+    if user_id is None:
+        doc = sessions_col.find_one({}, {"user_id": 1})
+        user_id = doc["user_id"] if doc else "explain-user"
+    if session_id is None:
+        doc = sessions_col.find_one({"user_id": user_id}, {"_id": 1})
+        session_id = doc["_id"] if doc else "explain-session"
+
+    print(f"Explaining queries for user_id={user_id!r} session_id={session_id!r}\n")
+    for name, col, cmd in _query_catalog(repo, user_id, session_id):
+        is_write = "update" in cmd or "findAndModify" in cmd
+        verbosity = "queryPlanner" if is_write else "executionStats"
+        result = repo.db.command({"explain": cmd, "verbosity": verbosity})
+
+        planner = result.get("queryPlanner", {})
+        winning = planner.get("winningPlan", {})
+        # Newer servers nest the classic plan under queryPlan
+        winning = winning.get("queryPlan", winning)
+        stages = _plan_stages(winning)
+
+        print(f"▶ {name} [{col.name}]")
+        print(f"   command: {json.dumps(cmd, default=str)}")
+        print(f"   plan:    {' <- '.join(stages)}")
+        stats = result.get("executionStats")
+        if stats:
+            print(f"   returned={stats.get('nReturned')} "
+                  f"keysExamined={stats.get('totalKeysExamined')} "
+                  f"docsExamined={stats.get('totalDocsExamined')} "
+                  f"timeMs={stats.get('executionTimeMillis')}")
+        if any(s.startswith("COLLSCAN") for s in stages):
+            print("   ⚠️  collection scan — no index serves this query")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MindCare AI database tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("ensure-indexes", help="create missing indexes")
+
+    explain = sub.add_parser("explain", help="print query plans for database.py queries")
+    explain.add_argument("--user-id", default=None)
+    explain.add_argument("--session-id", default=None)
+
+    archive = sub.add_parser("archive", help="move stale sessions to sessions_archive")
+    archive.add_argument("--finished-days", type=float, default=None)
+    archive.add_argument("--abandoned-hours", type=float, default=None)
+
+    args = parser.parse_args()
+    if args.command == "ensure-indexes":
+        print(ensure_indexes())
+    elif args.command == "explain":
+        explain_queries(args.user_id, args.session_id)
+    elif args.command == "archive":
+        moved = archive_stale_sessions(args.finished_days, args.abandoned_hours)
+        print(f"📦 Archived {moved} session(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,60 @@
 # main.py
 import uuid
-from fastapi import FastAPI, HTTPException
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 from dotenv import load_dotenv
+import os
 import re
 
 # Local modules
 from database import (
-    create_user, get_user, create_session, add_message,
-    save_summary, get_session, get_user_sessions, mark_emailed,
-    update_user_email_consent
+    create_user, get_user, create_session, get_session,
+    get_user_sessions, get_user_session, SessionTurn,
+    update_user_email_consent, ensure_indexes,
+    DEFAULT_HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE
 )
 from email_utils import send_summary_email
 from agent_graph import run_agent_step   # ✅ LangGraph agent
 from memory import memory_manager
+import warmup
+from tools.text_cache import text_cache
+from tools import shadow_eval
 
 # Load environment variables
 load_dotenv()
 
+
+# --- Startup ---
+def bootstrap_indexes():
+    """Create missing Mongo indexes (disable with MONGO_AUTO_INDEX=false)."""
+    if os.getenv("MONGO_AUTO_INDEX", "true").lower() in ("0", "false", "no"):
+        return
+    try:
+        created = ensure_indexes()
+        print(f"🗂️  Mongo indexes ensured: {created}")
+    except Exception as e:
+        # Queries still work unindexed; the next startup retries
+        print(f"⚠️  Could not ensure Mongo indexes: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index bootstrap and warmup both run in background threads, so an
+    # unreachable Mongo (30 s server selection) or a slow model load never
+    # holds up startup; /ready reports when warmup is done (see warmup.py)
+    threading.Thread(target=bootstrap_indexes, name="mongo-indexes", daemon=True).start()
+    warmup.start_warmup()
+    yield
+
+
 # Initialize FastAPI
-app = FastAPI(title="MindCare AI", version="3.0.0 (LangGraph Enabled)")
+app = FastAPI(title="MindCare AI", version="3.0.0 (LangGraph Enabled)", lifespan=lifespan)
+
+
 # --- Helpers ---
 def _clean_section(text: str) -> str:
     if not text:
@@ -145,9 +179,13 @@ def start_session(req: StartSessionRequest):
         print(f"   Updated consent_email: {user.get('consent_email')}")
         print(f"   Updated email: {user.get('email')}")
 
-    # Generate session id
+    # First opening line
+    opening = "👋 Hi, I'm here to listen. How have you been feeling lately?"
+
+    # Generate session id; the opening line is stored with the insert
     session_id = str(uuid.uuid4())
-    create_session(session_id, req.user_id, custom_email=req.email)
+    create_session(session_id, req.user_id, custom_email=req.email,
+                   initial_messages=[("assistant", opening)])
     print(f"✅ Session created: {session_id}")
     print(f"{'='*60}\n")
 
@@ -155,11 +193,7 @@ def start_session(req: StartSessionRequest):
     memory_manager.start_session(session_id)
     memory_manager.short_term.start_session(req.user_id, session_id)
 
-    # First opening line
-    opening = "👋 Hi, I'm here to listen. How have you been feeling lately?"
-
-    # Save in DB + both memories
-    add_message(session_id, "assistant", opening)
+    # Save in both memories
     memory_manager.add_message(session_id, "assistant", opening)
     memory_manager.short_term.add_message(req.user_id, "assistant", opening, {
         "session_id": session_id,
@@ -175,7 +209,9 @@ def start_session(req: StartSessionRequest):
 @app.post("/session/respond")
 def respond(req: RespondRequest):
     """Handle user response (via LangGraph agent)"""
-    session = get_session(req.session_id)
+    # custom_email for the finish path, message_count so the turn's messages
+    # are written in one round trip; the session is not re-read
+    session = get_session(req.session_id, fields=["custom_email", "message_count"])
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -199,10 +235,14 @@ def respond(req: RespondRequest):
     # Determine assistant text from agent result (reply OR question)
     assistant_text = result.get("reply") or result.get("question") or ""
 
-    # Save in DB and both memories
-    add_message(req.session_id, "user", req.answer)
-    add_message(req.session_id, "assistant", assistant_text)
-    
+    # Save this turn in DB first, as one update (messages + summary when
+    # finishing), so a failure in the memory/email work below can't drop it
+    with SessionTurn(req.session_id, message_count=session.get("message_count")) as turn:
+        turn.add_message("user", req.answer)
+        turn.add_message("assistant", assistant_text)
+        if req.finished:
+            turn.save_summary(result.get("summary") or "", result.get("risk", "low"))
+
     # Add to short-term memory
     memory_manager.short_term.add_message(req.user_id, "user", req.answer, {
         "session_id": req.session_id,
@@ -226,16 +266,12 @@ def respond(req: RespondRequest):
         email_attempted = False
         email_sent = False
 
-        # Save summary in DB
-        save_summary(req.session_id, summary, risk)
-
         # Email summary if consented
         print(f"\n{'='*60}")
         print(f"📧 EMAIL DEBUG - Session finished for user: {req.user_id}")
         print(f"{'='*60}")
         
         user = get_user(req.user_id)
-        session = get_session(req.session_id)
         
         print(f"👤 User found: {user is not None}")
         if user:
@@ -286,7 +322,8 @@ def respond(req: RespondRequest):
             )
             print(f"📧 Email send result: {email_sent}")
             if email_sent:
-                mark_emailed(req.session_id)
+                turn.mark_emailed()
+                turn.commit()
                 print(f"✅ Email marked as sent in database")
         else:
             print(f"\n⏭️  Skipping email - conditions not met")
@@ -343,10 +380,33 @@ def respond(req: RespondRequest):
 
 
 @app.get("/user/{user_id}/history")
-def get_history(user_id: str):
-    """Fetch all past sessions for a user"""
-    sessions = get_user_sessions(user_id)
-    return {"sessions": sessions}
+def get_history(
+    user_id: str,
+    limit: int = Query(DEFAULT_HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+):
+    """Fetch a page of past sessions (summary metadata only), newest first.
+
+    Pass the returned `next_cursor` back as `cursor` to get the next page.
+    Archived sessions are included only with include_archived=true.
+    """
+    try:
+        sessions, next_cursor = get_user_sessions(
+            user_id, limit=limit, cursor=cursor, include_archived=include_archived
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+@app.get("/user/{user_id}/history/{session_id}")
+def get_history_session(user_id: str, session_id: str, include_messages: bool = True):
+    """Fetch one past session, including its messages unless include_messages=false."""
+    session = get_user_session(user_id, session_id, include_messages=include_messages)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session": session}
 
 
 @app.get("/user/{user_id}/checkpoints")
@@ -388,4 +448,23 @@ def get_session_history(user_id: str):
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "mindcareai_pr", "version": "3.0.0"}
\ No newline at end of file
+    return {"status": "ok", "service": "mindcareai_pr", "version": "3.0.0"}
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit/miss counters of the text-analysis result cache (this worker only)."""
+    return {"text_cache": text_cache.stats()}
+
+
+@app.get("/stats/shadow")
+def shadow_stats():
+    """Agreement and latency of shadowed candidate emotion models vs the serving one (this worker only)."""
+    return shadow_eval.stats()
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until startup warmup has loaded models and primed the tools."""
+    status = warmup.readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# ml_model/bench_utils.py
+"""
+Helpers shared by the micro-benchmarks run as scripts
+(ml_model/preprocessing.py, tools/lexicon_sentiment.py,
+tools/keyword_matcher.py): the --texts sample loader and best-of-N timing.
+"""
+import time
+import argparse
+from pathlib import Path
+
+DEFAULT_TEXTS = Path(__file__).resolve().parent / "data" / "isear.csv"
+
+
+def texts_parser(description):
+    """ArgumentParser with the shared --texts option."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--texts", default=str(DEFAULT_TEXTS),
+                        help="CSV with a Content column, or a plain text file (one message per line)")
+    return parser
+
+
+def load_texts(path):
+    """Messages from a CSV's Content column, or from a text file (one per line)."""
+    path = str(path)
+    if path.endswith(".csv"):
+        import pandas as pd
+        return pd.read_csv(path)["Content"].astype(str).tolist()
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def time_per_message(name, run, n, repeat=3, width=8):
+    """Time run() (one pass over n messages) repeat times and print the best run per message."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    print(f"⏱️  {name:{width}}: {best * 1e6 / n:8.1f} µs/message ({n} messages, best of {repeat})")
+    return best
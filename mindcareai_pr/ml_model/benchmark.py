@@ -0,0 +1,196 @@
+# ml_model/benchmark.py
+"""
+Latency / throughput / memory / accuracy benchmark for the emotion model,
+measured through the serving path (tools/emotion_tool.predict_emotions).
+
+Usage:
+    python ml_model/benchmark.py [--engine sklearn|compact|both]
+        [--data CSV] [--n-single 500] [--batch-sizes 1,8,32,128,512]
+        [--out FILE] [--baseline PREVIOUS.json]
+
+Reports, per engine:
+  * load_ms / rss_mb: model load time and resident-memory growth
+  * single_ms: p50/p95/p99 latency of one-text calls
+  * batch: texts/second at each batch size
+  * accuracy / macro_f1 on the held-out set
+
+--data takes test_predictions.csv (text, gold; already cleaned, so accuracy
+is scored on the model directly) or a raw CSV with Content and Emotion
+columns (scored through predict_emotions). The JSON report goes to
+ml_model/benchmarks/<timestamp>.json unless --out is given; --baseline
+prints deltas against an earlier report.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE.parent))
+
+from tools import emotion_tool  # noqa: E402
+
+DEFAULT_DATA = BASE / "test_predictions.csv"
+DEFAULT_OUT_DIR = BASE / "benchmarks"
+
+
+def rss_mb():
+    """Current resident set size in MB (None where it can't be read)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_heldout(path):
+    """(texts, labels, precleaned): test_predictions.csv texts went through clean_text already."""
+    df = pd.read_csv(path)
+    precleaned = {"text", "gold"} <= set(df.columns)
+    if precleaned:
+        df = df.rename(columns={"text": "Content", "gold": "Emotion"})
+    df = df.dropna(subset=["Content", "Emotion"])
+    texts = df["Content"].astype(str).tolist()
+    return texts, df["Emotion"].astype(str).str.lower().str.strip().tolist(), precleaned
+
+
+def _percentiles(samples_ms):
+    return {f"p{p}": round(float(np.percentile(samples_ms, p)), 3) for p in (50, 95, 99)} | {
+        "mean": round(float(np.mean(samples_ms)), 3)
+    }
+
+
+def bench_engine(engine, texts, labels, precleaned, n_single, batch_sizes):
+    """Benchmark one engine; swaps it in as emotion_tool's active model."""
+    emotion_tool.EMOTION_ENGINE = engine
+    emotion_tool._active = None
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    loaded = emotion_tool._load_model(*emotion_tool._resolve_source())
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after = rss_mb()
+    emotion_tool._active = loaded
+    emotion_tool.MODEL_CHECK_INTERVAL_SECONDS = float("inf")  # no reload checks mid-run
+
+    # Warm up caches (lemmas, numpy code paths) before timing
+    emotion_tool.predict_emotions(texts[:50])
+
+    single = []
+    for text in texts[:n_single]:
+        t0 = time.perf_counter()
+        emotion_tool.predict_emotions([text])
+        single.append((time.perf_counter() - t0) * 1000)
+
+    batch = {}
+    for size in batch_sizes:
+        chunks = [texts[i:i + size] for i in range(0, min(len(texts), max(size * 8, 512)), size)]
+        chunks = [c for c in chunks if len(c) == size] or [texts[:size]]
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            emotion_tool.predict_emotions(chunk)
+        elapsed = time.perf_counter() - t0
+        batch[str(size)] = {"texts_per_s": round(sum(map(len, chunks)) / elapsed, 1),
+                            "ms_per_batch": round(elapsed * 1000 / len(chunks), 3)}
+
+    start = time.perf_counter()
+    if precleaned:
+        # Don't clean twice; score exactly what the model was evaluated on in training
+        probs = loaded.model.predict_proba(texts)
+        predicted = np.asarray(loaded.model.classes_)[probs.argmax(axis=1)].astype(str)
+    else:
+        predicted = emotion_tool.predict_emotions(texts)["emotion"].astype(str)
+    full_s = time.perf_counter() - start
+
+    result = {
+        "model_version": loaded.version,
+        "load_ms": round(load_ms, 1),
+        "rss_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+        "single_ms": _percentiles(single),
+        "batch": batch,
+        "heldout": {
+            "n": len(texts),
+            "accuracy": round(accuracy_score(labels, predicted), 4),
+            "macro_f1": round(f1_score(labels, predicted, average="macro"), 4),
+            "seconds": round(full_s, 3),
+        },
+    }
+    print(f"\n=== {engine} ({loaded.version}) ===")
+    print(f"⏳ load {result['load_ms']} ms, +{result['rss_mb']} MB RSS")
+    print(f"⏱️  single: " + ", ".join(f"{k}={v} ms" for k, v in result["single_ms"].items()))
+    for size, row in batch.items():
+        print(f"📦 batch {size:>4}: {row['texts_per_s']:>10} texts/s ({row['ms_per_batch']} ms/batch)")
+    print(f"🎯 held-out accuracy {result['heldout']['accuracy']}, macro-F1 {result['heldout']['macro_f1']}")
+    return result
+
+
+def _print_deltas(report, baseline):
+    print("\n=== Δ vs baseline ===")
+    for engine, cur in report["engines"].items():
+        old = baseline.get("engines", {}).get(engine)
+        if not old:
+            continue
+        rows = [
+            ("single p50 ms", cur["single_ms"]["p50"], old["single_ms"]["p50"]),
+            ("single p99 ms", cur["single_ms"]["p99"], old["single_ms"]["p99"]),
+            ("load ms", cur["load_ms"], old["load_ms"]),
+            ("accuracy", cur["heldout"]["accuracy"], old["heldout"]["accuracy"]),
+            ("macro_f1", cur["heldout"]["macro_f1"], old["heldout"]["macro_f1"]),
+        ]
+        for name, new, prev in rows:
+            print(f"{engine:8} {name:14} {prev:>10} -> {new:>10} ({new - prev:+.4g})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the emotion model")
+    parser.add_argument("--engine", choices=["sklearn", "compact", "both"], default=emotion_tool.EMOTION_ENGINE)
+    parser.add_argument("--data", default=str(DEFAULT_DATA))
+    parser.add_argument("--n-single", type=int, default=500)
+    parser.add_argument("--batch-sizes", default="1,8,32,128,512")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    args = parser.parse_args()
+
+    texts, labels, precleaned = load_heldout(args.data)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b]
+    engines = ["sklearn", "compact"] if args.engine == "both" else [args.engine]
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "data": str(args.data),
+        "host": {"python": platform.python_version(), "machine": platform.machine(),
+                 "processor": platform.processor(), "cpus": os.cpu_count()},
+        "engines": {},
+    }
+    for engine in engines:
+        try:
+            report["engines"][engine] = bench_engine(engine, texts, labels, precleaned, args.n_single, batch_sizes)
+        except FileNotFoundError as e:
+            print(f"⚠️  Skipping {engine}: {e}")
+
+    out = Path(args.out) if args.out else DEFAULT_OUT_DIR / f"{datetime.utcnow():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\n📝 Report written to {out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            _print_deltas(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# ml_model/export_compact_model.py
+"""
+Compile the trained emotion_model.pkl into emotion_model.npz, the
+array-only artifact scored by tools/compact_emotion.py.
+
+Usage:
+    python ml_model/export_compact_model.py                 # export
+    python ml_model/export_compact_model.py --verify        # export + parity check
+    python ml_model/export_compact_model.py --verify-only   # parity check of an existing export
+
+The parity check scores the texts in test_predictions.csv (or --texts FILE,
+one text per line) with both the pickled pipeline and the compact model and
+fails if any predicted label differs or probabilities drift beyond --atol.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE.parent))
+
+from tools.compact_emotion import CompactEmotionModel  # noqa: E402
+from ml_model.registry import file_sha256  # noqa: E402
+
+DEFAULT_MODEL = BASE / "emotion_model.pkl"
+DEFAULT_OUT = BASE / "emotion_model.npz"
+
+
+def _check_vectorizer(vec):
+    """The compact scorer re-implements only the default word analyzer."""
+    if not isinstance(vec, TfidfVectorizer):
+        raise ValueError(f"Only TfidfVectorizer models can be compiled (got {type(vec).__name__}); "
+                         "hashing models are already stateless.")
+    unsupported = {
+        "analyzer": vec.analyzer != "word",
+        "preprocessor": vec.preprocessor is not None,
+        "tokenizer": vec.tokenizer is not None,
+        "stop_words": vec.stop_words is not None,
+        "strip_accents": vec.strip_accents is not None,
+        "binary": vec.binary,
+        "use_idf": not vec.use_idf,
+        "norm": vec.norm not in ("l2", None),
+    }
+    bad = [k for k, v in unsupported.items() if v]
+    if bad:
+        raise ValueError(f"Vectorizer settings not supported by the compact scorer: {bad}")
+
+
+def _linear_block(estimator):
+    """(coef (n_classes, n_features), intercept (n_classes,)) of a fitted linear model."""
+    coef = np.asarray(estimator.coef_, dtype=float)
+    intercept = np.broadcast_to(np.asarray(estimator.intercept_, dtype=float), coef.shape[:1])
+    return coef, intercept
+
+
+def compile_pipeline(pipeline, source_sha256=None):
+    """
+    Return the npz payload (dict of arrays) for a fitted emotion pipeline.
+    source_sha256 (of the emotion_model.pkl it came from) lets the registry
+    tell a matching export from a stale one.
+    """
+    vec, ensemble = pipeline[0], pipeline[-1]
+    _check_vectorizer(vec)
+    if getattr(ensemble, "voting", None) != "soft":
+        raise ValueError("Only soft-voting ensembles can be compiled (retrain with train_emotion_model.py).")
+
+    classes = np.asarray(ensemble.classes_)
+    n_classes = len(classes)
+    if n_classes < 3:
+        raise ValueError("The compact scorer expects a multiclass model (>= 3 emotions).")
+
+    blocks, intercepts, members = [], [], []
+
+    def add_block(estimator):
+        coef, intercept = _linear_block(estimator)
+        if coef.shape[0] != n_classes:
+            raise ValueError(f"{type(estimator).__name__} was not fitted on all {n_classes} classes")
+        start = sum(b.shape[0] for b in blocks)
+        blocks.append(coef)
+        intercepts.append(intercept)
+        return [start, start + coef.shape[0]]
+
+    for est in ensemble.estimators_:
+        if isinstance(est, LogisticRegression):
+            ovr = getattr(est, "multi_class", "auto") == "ovr" or est.solver == "liblinear"
+            members.append({"kind": "ovr" if ovr else "softmax", "rows": add_block(est)})
+        elif isinstance(est, CalibratedClassifierCV):
+            folds = []
+            for cc in est.calibrated_classifiers_:
+                if cc.method != "sigmoid" or not isinstance(cc.estimator, LinearSVC):
+                    raise ValueError("Only sigmoid-calibrated LinearSVC members are supported.")
+                folds.append({
+                    "rows": add_block(cc.estimator),
+                    "a": [float(c.a_) for c in cc.calibrators],
+                    "b": [float(c.b_) for c in cc.calibrators],
+                })
+            members.append({"kind": "calibrated", "folds": folds})
+        else:
+            raise ValueError(f"Unsupported ensemble member: {type(est).__name__}")
+
+    # Sorted byte-string vocabulary; column order follows the sort
+    vocab = vec.vocabulary_
+    terms = sorted(vocab, key=lambda t: t.encode("utf-8"))
+    order = np.array([vocab[t] for t in terms])
+    weights = np.vstack(blocks).T[order]          # (n_features, n_rows)
+
+    weights_param = ensemble.weights
+    spec = {
+        "version": 1,
+        "ngram_range": list(vec.ngram_range),
+        "lowercase": bool(vec.lowercase),
+        "token_pattern": vec.token_pattern,
+        "sublinear_tf": bool(vec.sublinear_tf),
+        "norm": vec.norm,
+        "members": members,
+        "member_weights": list(weights_param) if weights_param is not None else None,
+        "source_sha256": source_sha256,
+    }
+    return {
+        "terms": np.array([t.encode("utf-8") for t in terms]),
+        "idf": vec.idf_[order].astype(float),
+        "weights": np.ascontiguousarray(weights),
+        "intercepts": np.concatenate(intercepts),
+        "classes": classes.astype(str),
+        "spec": np.array(json.dumps(spec)),
+    }
+
+
+def export(model_path=DEFAULT_MODEL, out_path=DEFAULT_OUT):
+    pipeline = joblib.load(model_path)
+    payload = compile_pipeline(pipeline, file_sha256(model_path))
+    np.savez_compressed(out_path, **payload)
+    size_mb = Path(out_path).stat().st_size / 1e6
+    print(f"✅ Compact model written to {out_path} ({size_mb:.1f} MB, "
+          f"{len(payload['terms'])} terms, {payload['weights'].shape[1]} linear rows)")
+    return pipeline
+
+
+def _load_texts(path):
+    if path is None:
+        path = BASE / "test_predictions.csv"
+        return pd.read_csv(path)["text"].astype(str).tolist()
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def verify(pipeline, compact_path=DEFAULT_OUT, texts=None, atol=1e-9):
+    """Parity check: same labels and (within atol) same probabilities. Returns True on success."""
+    compact = CompactEmotionModel(compact_path)
+    texts = list(texts)
+
+    start = time.perf_counter()
+    expected = pipeline.predict_proba(texts)
+    sk_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    got = compact.predict_proba(texts)
+    np_ms = (time.perf_counter() - start) * 1000
+
+    label_diff = int((expected.argmax(axis=1) != got.argmax(axis=1)).sum())
+    max_err = float(np.abs(expected - got).max()) if len(texts) else 0.0
+    print(f"🔎 Parity on {len(texts)} texts: label mismatches={label_diff}, max |Δp|={max_err:.2e}")
+
+    # Per-call latency is what the service pays (one text per request)
+    sample = texts[:200]
+    start = time.perf_counter()
+    for t in sample:
+        pipeline.predict_proba([t])
+    sk_single = (time.perf_counter() - start) * 1000 / max(len(sample), 1)
+    start = time.perf_counter()
+    for t in sample:
+        compact.predict_proba([t])
+    np_single = (time.perf_counter() - start) * 1000 / max(len(sample), 1)
+    print(f"⏱️  batch: sklearn {sk_ms:.1f} ms vs compact {np_ms:.1f} ms | "
+          f"single: sklearn {sk_single:.3f} ms vs compact {np_single:.3f} ms")
+
+    ok = label_diff == 0 and max_err <= atol
+    print("✅ Parity OK" if ok else "❌ Parity FAILED")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export emotion_model.pkl to a compact NumPy artifact")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL))
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--verify", action="store_true", help="run the parity check after exporting")
+    parser.add_argument("--verify-only", action="store_true", help="only run the parity check")
+    parser.add_argument("--texts", default=None, help="parity texts, one per line (default: test_predictions.csv)")
+    parser.add_argument("--atol", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    if args.verify_only:
+        pipeline = joblib.load(args.model)
+    else:
+        pipeline = export(args.model, args.out)
+    if args.verify or args.verify_only:
+        if not verify(pipeline, args.out, _load_texts(args.texts), args.atol):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# ml_model/incremental.py
+"""
+Incremental (online) learning for the emotion model.
+
+The online model is a stateless HashingVectorizer feeding an SGDClassifier
+with log loss, so it has predict_proba/classes_ like the ensemble and loads
+through tools/emotion_tool.py unchanged. New labeled messages (explicit
+feedback, agreement with the facial-emotion signal, reviewed sessions, ...)
+are folded in with partial_fit in seconds instead of refitting all of ISEAR.
+
+Each update starts from the active registry version (it must be an online
+model; create the first one with `bootstrap`), mixes a replay sample of the
+base corpus into the new batch so earlier classes aren't forgotten, checks
+accuracy on the same held-out ISEAR split train_emotion_model.py uses, and
+publishes the result as a new registry version that workers hot-swap to.
+An update whose accuracy drops by more than --max-drop is not published.
+
+Usage:
+    python ml_model/incremental.py bootstrap [--data CSV] [--epochs 5] [--no-publish --out DIR]
+    python ml_model/incremental.py update BATCH.csv|BATCH.jsonl [--epochs 3] [--replay 2000]
+        [--max-drop 0.02] [--force] [--no-publish --out DIR]
+
+Batch files hold `text` and `label` columns (CSV) or objects (JSONL), plus an
+optional `source`; labels outside the model's classes are skipped. The
+online model has no compact (.npz) export, so run it with EMOTION_ENGINE=sklearn.
+"""
+import sys
+import json
+import time
+import tempfile
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score, log_loss
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE.parent))
+from ml_model.preprocessing import clean_texts, PREPROCESSING_VERSION  # noqa: E402
+from ml_model.train_emotion_model import LABEL_MAP, DEFAULT_DATA, load_dataset, _fix  # noqa: E402
+from ml_model import registry  # noqa: E402
+
+CLASSES = np.array(sorted(LABEL_MAP["polarity_map"]))
+HASH_FEATURES = 2 ** 18
+MODEL_KIND = "hashing-sgd-online"
+
+
+def build_online_model(hash_features=HASH_FEATURES, alpha=1e-5, seed=42):
+    return Pipeline([
+        ("hashing", HashingVectorizer(ngram_range=(1, 2), n_features=hash_features,
+                                      alternate_sign=False, norm="l2")),
+        ("sgd", SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)),
+    ])
+
+
+def is_online_model(model):
+    return isinstance(model, Pipeline) and hasattr(model[-1], "partial_fit") \
+        and isinstance(model[0], HashingVectorizer)
+
+
+def partial_fit(model, texts, labels, epochs=1, seed=42):
+    """Run `epochs` shuffled partial_fit passes over already-cleaned texts."""
+    if hasattr(model[-1], "coef_"):
+        model[-1].densify()  # saved sparse; SGD updates need dense weights
+    X = model[:-1].transform(texts)
+    y = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        model[-1].partial_fit(X[order], y[order], classes=CLASSES)
+    return model
+
+
+# =========================
+# Data
+# =========================
+def load_batch(path):
+    """Labeled messages from CSV or JSONL -> (texts, labels, sources)."""
+    path = Path(path)
+    if path.suffix in (".jsonl", ".ndjson"):
+        df = pd.read_json(path, lines=True)
+    else:
+        df = pd.read_csv(path)
+    if "source" not in df.columns:
+        df["source"] = "unknown"
+    df = df.dropna(subset=["text", "label"])
+    df["label"] = df["label"].astype(str).str.lower().str.strip().apply(_fix)
+
+    unknown = ~df["label"].isin(CLASSES)
+    if unknown.any():
+        print(f"⚠️ Skipping {int(unknown.sum())} rows with unknown labels: "
+              f"{sorted(df.loc[unknown, 'label'].unique())}")
+        df = df[~unknown]
+    if df.empty:
+        raise ValueError(f"No usable labeled rows in {path}")
+    return df["text"].astype(str).tolist(), df["label"].tolist(), df["source"].astype(str).tolist()
+
+
+def base_split(data_path, test_size=0.2, seed=42):
+    """ISEAR cleaned and split exactly like train_emotion_model.py (train = replay pool)."""
+    texts, labels = load_dataset(data_path)
+    cleaned = clean_texts(texts)
+    return train_test_split(cleaned, labels.tolist(), test_size=test_size, stratify=labels, random_state=seed)
+
+
+def evaluate(model, texts, labels):
+    proba = model.predict_proba(texts)
+    pred = model.classes_[proba.argmax(axis=1)]
+    return {
+        "accuracy": round(accuracy_score(labels, pred), 4),
+        "macro_f1": round(f1_score(labels, pred, average="macro"), 4),
+        "log_loss": round(log_loss(labels, proba, labels=model.classes_), 4),
+    }
+
+
+# =========================
+# Save / publish
+# =========================
+def save_and_publish(model, metrics, out_dir=None, publish=True):
+    if out_dir is None:
+        if not publish:
+            raise ValueError("--no-publish needs --out, or the model would be discarded")
+        with tempfile.TemporaryDirectory(prefix="emotion-online-") as tmp:
+            return save_and_publish(model, metrics, tmp, publish)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Only the hashed n-grams seen in training have weights: sparse coef_
+    # keeps the pickle ~1 MB instead of classes x HASH_FEATURES floats and
+    # avoids copying the dense matrix on every prediction
+    model[-1].sparsify()
+    joblib.dump(model, out_dir / "emotion_model.pkl")
+    with open(out_dir / "label_map.json", "w", encoding="utf-8") as f:
+        json.dump(LABEL_MAP, f, indent=4)
+    with open(out_dir / "metrics.json", "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=4, default=str)
+    print(f"Saved online model to {out_dir}")
+    if publish:
+        return registry.publish(out_dir)
+    return None
+
+
+def _active_online_model():
+    current = registry.current_version()
+    if current is None:
+        raise RuntimeError("No model in the registry; run `incremental.py bootstrap` first.")
+    version, version_dir = current
+    model = joblib.load(version_dir / "emotion_model.pkl")
+    if not is_online_model(model):
+        raise RuntimeError(f"Active version {version} is not an online model; run `incremental.py bootstrap`.")
+    metrics_path = version_dir / "metrics.json"
+    metrics = json.loads(metrics_path.read_text(encoding="utf-8")) if metrics_path.exists() else {}
+    return version, model, metrics
+
+
+# =========================
+# Commands
+# =========================
+def bootstrap(args):
+    X_train, X_test, y_train, y_test = base_split(args.data, seed=args.seed)
+    start = time.perf_counter()
+    model = partial_fit(build_online_model(seed=args.seed), X_train, y_train, args.epochs, args.seed)
+    seconds = time.perf_counter() - start
+    scores = evaluate(model, X_test, y_test)
+    print(f"🎯 Bootstrap accuracy {scores['accuracy']}, macro-F1 {scores['macro_f1']} ({seconds:.1f}s)")
+
+    metrics = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "vectorizer": MODEL_KIND,
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "parent": None,
+        "samples_seen": len(y_train) * args.epochs,
+        "updates": [],
+        "classes": list(model.classes_),
+        **scores,
+    }
+    return save_and_publish(model, metrics, args.out, publish=not args.no_publish)
+
+
+def update(args):
+    parent, model, parent_metrics = _active_online_model()
+    texts, labels, sources = load_batch(args.batch)
+    cleaned = clean_texts(texts)
+    print(f"📥 {len(cleaned)} labeled messages from {args.batch} "
+          f"({pd.Series(sources).value_counts().to_dict()})")
+
+    replay_pool, X_test, replay_labels, y_test = base_split(args.data, seed=args.seed)
+    if args.replay:
+        rng = np.random.default_rng(args.seed)
+        idx = rng.choice(len(replay_pool), size=min(args.replay, len(replay_pool)), replace=False)
+        cleaned = cleaned + [replay_pool[i] for i in idx]
+        labels = labels + [replay_labels[i] for i in idx]
+
+    before = evaluate(model, X_test, y_test)
+    start = time.perf_counter()
+    partial_fit(model, cleaned, labels, args.epochs, args.seed)
+    seconds = time.perf_counter() - start
+    after = evaluate(model, X_test, y_test)
+    drop = before["accuracy"] - after["accuracy"]
+    print(f"🎯 Held-out accuracy {before['accuracy']} -> {after['accuracy']}, "
+          f"macro-F1 {before['macro_f1']} -> {after['macro_f1']} ({seconds:.1f}s)")
+
+    if drop > args.max_drop and not args.force:
+        print(f"❌ Accuracy dropped by {drop:.4f} (> --max-drop {args.max_drop}); not publishing.")
+        return None
+
+    metrics = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "vectorizer": MODEL_KIND,
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "parent": parent,
+        "samples_seen": parent_metrics.get("samples_seen", 0) + len(labels) * args.epochs,
+        "updates": parent_metrics.get("updates", []) + [{
+            "batch": str(args.batch),
+            "rows": len(texts),
+            "replay": len(labels) - len(texts),
+            "sources": pd.Series(sources).value_counts().to_dict(),
+            "accuracy_before": before["accuracy"],
+            "seconds": round(seconds, 2),
+        }],
+        "classes": list(model.classes_),
+        **after,
+    }
+    return save_and_publish(model, metrics, args.out, publish=not args.no_publish)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental learning for the MindCare emotion model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    boot = sub.add_parser("bootstrap", help="train the first online model on the base corpus")
+    boot.add_argument("--epochs", type=int, default=5)
+
+    upd = sub.add_parser("update", help="fold a batch of labeled messages into the active online model")
+    upd.add_argument("batch", help="CSV or JSONL with text, label[, source]")
+    upd.add_argument("--epochs", type=int, default=3)
+    upd.add_argument("--replay", type=int, default=2000, help="base-corpus rows mixed into the batch (default 2000)")
+    upd.add_argument("--max-drop", type=float, default=0.02, help="max held-out accuracy drop to still publish")
+    upd.add_argument("--force", action="store_true", help="publish even if accuracy dropped more than --max-drop")
+
+    for p in (boot, upd):
+        p.add_argument("--data", default=str(DEFAULT_DATA), help="base corpus for replay and evaluation")
+        p.add_argument("--seed", type=int, default=42)
+        p.add_argument("--out", default=None, help="also keep the artifacts in this directory")
+        p.add_argument("--no-publish", action="store_true", help="don't publish to the registry")
+
+    args = parser.parse_args(argv)
+    if args.command == "bootstrap":
+        bootstrap(args)
+    else:
+        update(args)
+
+
+if __name__ == "__main__":
+    main()
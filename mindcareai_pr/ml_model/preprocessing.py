@@ -0,0 +1,119 @@
+# ml_model/preprocessing.py
+"""
+Text preprocessing shared by training (train_emotion_model.py) and
+inference (tools/emotion_tool.py), so the model always sees text cleaned the
+same way it was trained on.
+
+clean_text: lowercase -> strip URLs -> keep letters/whitespace -> drop
+stopwords -> WordNet lemmatize. Regexes are compiled once, the stopword set
+is a frozenset and lemmas are memoized per word (vocabulary is small and
+Zipfian, so almost every token is a cache hit).
+
+Benchmark per-message cost (and check parity with the original inline
+implementation):
+    python ml_model/preprocessing.py [--texts FILE]
+"""
+import re
+import threading
+from functools import lru_cache
+
+import nltk
+
+# Bump whenever clean_text's output changes: it keys the training caches
+PREPROCESSING_VERSION = 1
+
+URL_RE = re.compile(r"http\S+|www\S+")
+NON_ALPHA_RE = re.compile(r"[^a-z\s]")
+
+LEMMA_CACHE_SIZE = 100_000
+
+_lock = threading.Lock()
+_stop_words = None
+_lemmatizer = None
+
+
+def _nltk_resource(name, path):
+    """Load an NLTK corpus, downloading it once if it's missing."""
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(name, quiet=True)
+        nltk.data.find(path)  # still missing -> LookupError with NLTK's hint
+
+
+def _resources():
+    global _stop_words, _lemmatizer
+    if _lemmatizer is None:
+        with _lock:
+            if _lemmatizer is None:
+                _nltk_resource("stopwords", "corpora/stopwords")
+                _nltk_resource("wordnet", "corpora/wordnet")
+                from nltk.corpus import stopwords
+                from nltk.stem import WordNetLemmatizer
+                _stop_words = frozenset(stopwords.words("english"))
+                _lemmatizer = WordNetLemmatizer()
+    return _stop_words, _lemmatizer
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(word):
+    return _resources()[1].lemmatize(word)
+
+
+def clean_text(text):
+    stop_words = _resources()[0]
+    text = NON_ALPHA_RE.sub("", URL_RE.sub("", str(text).lower()))
+    return " ".join([lemmatize(w) for w in text.split() if w not in stop_words])
+
+
+def clean_texts(texts):
+    return [clean_text(t) for t in texts]
+
+
+# =========================
+# Benchmark
+# =========================
+def _reference_clean(text):
+    """The original per-call implementation from train_emotion_model.py."""
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    stop_words = set(stopwords.words("english"))
+    lemmatizer = WordNetLemmatizer()
+    text = text.lower()
+    text = re.sub(r"http\S+|www\S+", "", text)
+    text = re.sub(r"[^a-z\s]", "", text)
+    tokens = text.split()
+    tokens = [lemmatizer.lemmatize(w) for w in tokens if w not in stop_words]
+    return " ".join(tokens)
+
+
+def _benchmark(texts, repeat=3):
+    from ml_model.bench_utils import time_per_message
+
+    _resources()
+    mismatches = sum(clean_text(t) != _reference_clean(t) for t in texts[:500])
+    print(f"🔎 Parity with the original clean_text on {min(len(texts), 500)} texts: {mismatches} mismatches")
+
+    # The original built the stopword set once per run; time it that way too
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    stop_words, lemmatizer = set(stopwords.words("english")), WordNetLemmatizer()
+
+    def original(text):
+        text = re.sub(r"[^a-z\s]", "", re.sub(r"http\S+|www\S+", "", text.lower()))
+        return " ".join([lemmatizer.lemmatize(w) for w in text.split() if w not in stop_words])
+
+    for name, fn in (("original", original), ("shared", clean_text)):
+        time_per_message(name, lambda: [fn(t) for t in texts], len(texts), repeat)
+    print(f"   lemma cache: {lemmatize.cache_info()}")
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from ml_model.bench_utils import texts_parser, load_texts
+
+    args = texts_parser("Benchmark the shared text preprocessor").parse_args()
+    _benchmark(load_texts(args.texts))
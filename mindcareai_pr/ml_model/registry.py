@@ -0,0 +1,192 @@
+# ml_model/registry.py
+"""
+Versioned model registry for the emotion model.
+
+Layout (MODEL_REGISTRY_DIR, default ml_model/registry/):
+
+    registry/
+      manifest.json          {"current": "<version>", "versions": {"<version>": {...}}}
+      <version>/
+        emotion_model.pkl
+        label_map.json
+        metrics.json          (optional; gets a "registry_version" entry)
+        emotion_model.npz     (optional, compact export of this emotion_model.pkl)
+
+Published version directories are never modified. Switching models is a
+single atomic rewrite of manifest.json (write temp + os.replace), which
+running workers watch (tools/emotion_tool.py) and hot-swap to.
+
+Usage:
+    python ml_model/registry.py publish [--from DIR] [--version V] [--no-activate]
+    python ml_model/registry.py list
+    python ml_model/registry.py activate VERSION     # also how you roll back
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE / "registry"))
+MANIFEST_NAME = "manifest.json"
+
+REQUIRED_ARTIFACTS = ("emotion_model.pkl", "label_map.json")
+OPTIONAL_ARTIFACTS = ("metrics.json", "emotion_model.npz")
+
+
+def manifest_path(registry_dir=None):
+    return Path(registry_dir or REGISTRY_DIR) / MANIFEST_NAME
+
+
+def read_manifest(registry_dir=None):
+    """The manifest dict, or None if nothing was ever published."""
+    path = manifest_path(registry_dir)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest, registry_dir=None):
+    path = manifest_path(registry_dir)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)  # readers see the old or the new manifest, never a partial one
+
+
+def file_sha256(path):
+    """Hex sha256 of a file, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _compact_source(npz_path):
+    """sha256 of the emotion_model.pkl a compact export was compiled from (None if not recorded)."""
+    import numpy as np
+    with np.load(npz_path) as data:
+        return json.loads(str(data["spec"])).get("source_sha256")
+
+
+def current_version(registry_dir=None):
+    """(version, version directory) of the active model, or None."""
+    manifest = read_manifest(registry_dir)
+    if not manifest or not manifest.get("current"):
+        return None
+    version = manifest["current"]
+    return version, Path(registry_dir or REGISTRY_DIR) / version
+
+
+def version_dir(version, registry_dir=None):
+    """Directory of a published version (KeyError if it was never published)."""
+    manifest = read_manifest(registry_dir)
+    if not manifest or version not in manifest["versions"]:
+        raise KeyError(f"Unknown model version {version!r}")
+    return Path(registry_dir or REGISTRY_DIR) / version
+
+
+def publish(source_dir=BASE, version=None, activate=True, registry_dir=None):
+    """
+    Copy a trained model's artifacts from source_dir into a new immutable
+    version directory and record it in the manifest (activating it unless
+    activate=False). Returns the version name.
+    """
+    source_dir = Path(source_dir)
+    registry_dir = Path(registry_dir or REGISTRY_DIR)
+    missing = [name for name in REQUIRED_ARTIFACTS if not (source_dir / name).exists()]
+    if missing:
+        raise FileNotFoundError(f"Cannot publish from {source_dir}: missing {missing}")
+
+    digest = file_sha256(source_dir / "emotion_model.pkl")
+    version = version or f"{datetime.utcnow():%Y%m%d-%H%M%S}-{digest[:8]}"
+    target = registry_dir / version
+    if target.exists():
+        raise FileExistsError(f"Version {version} already exists in {registry_dir}")
+
+    # Stage under a temp name so a crash never leaves a half-copied version
+    staging = registry_dir / f".staging-{version}"
+    staging.mkdir(parents=True)
+    files = {}
+    for name in REQUIRED_ARTIFACTS + OPTIONAL_ARTIFACTS:
+        if not (source_dir / name).exists():
+            continue
+        if name == "emotion_model.npz" and _compact_source(source_dir / name) != digest:
+            # A leftover export of an older model would be served under this version
+            print(f"⚠️  Skipping {source_dir / name}: not compiled from this emotion_model.pkl")
+            continue
+        shutil.copy2(source_dir / name, staging / name)
+
+    metrics = {}
+    if (staging / "metrics.json").exists():
+        # Record the version id in the published metrics.json itself
+        with open(staging / "metrics.json", "r", encoding="utf-8") as f:
+            full = json.load(f)
+        full["registry_version"] = version
+        with open(staging / "metrics.json", "w", encoding="utf-8") as f:
+            json.dump(full, f, indent=4)
+        metrics = {k: full.get(k) for k in ("accuracy", "macro_f1", "log_loss", "vectorizer")}
+    for name in sorted(os.listdir(staging)):
+        files[name] = file_sha256(staging / name)
+    os.replace(staging, target)
+
+    manifest = read_manifest(registry_dir) or {"current": None, "versions": {}}
+    manifest["versions"][version] = {
+        "created_at": datetime.utcnow().isoformat(),
+        "files": files,
+        "metrics": metrics,
+    }
+    if activate:
+        manifest["current"] = version
+        manifest["activated_at"] = datetime.utcnow().isoformat()
+    _write_manifest(manifest, registry_dir)
+    print(f"📦 Published model version {version}" + (" (active)" if activate else ""))
+    return version
+
+
+def activate(version, registry_dir=None):
+    """Point the manifest at an already-published version (deploy or rollback)."""
+    manifest = read_manifest(registry_dir)
+    if not manifest or version not in manifest["versions"]:
+        raise KeyError(f"Unknown model version {version!r}")
+    manifest["current"] = version
+    manifest["activated_at"] = datetime.utcnow().isoformat()
+    _write_manifest(manifest, registry_dir)
+    print(f"✅ Active model version is now {version}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MindCare emotion model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pub = sub.add_parser("publish", help="publish a trained model as a new version")
+    pub.add_argument("--from", dest="source", default=str(BASE), help="directory holding emotion_model.pkl etc.")
+    pub.add_argument("--version", default=None)
+    pub.add_argument("--no-activate", action="store_true")
+
+    sub.add_parser("list", help="list published versions")
+
+    act = sub.add_parser("activate", help="make a published version the active one")
+    act.add_argument("version")
+
+    args = parser.parse_args()
+    if args.command == "publish":
+        publish(args.source, args.version, activate=not args.no_activate)
+    elif args.command == "list":
+        manifest = read_manifest() or {"current": None, "versions": {}}
+        for version, info in sorted(manifest["versions"].items()):
+            marker = "*" if version == manifest["current"] else " "
+            print(f"{marker} {version}  {info['created_at']}  {info.get('metrics', {})}")
+    elif args.command == "activate":
+        activate(args.version)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,149 @@
+"""
+Train the MindCare emotion model (TF-IDF / hashing features -> soft-voting
+LogisticRegression + calibrated LinearSVC).
+
+Usage:
+    python ml_model/train_emotion_model.py [--data CSV] [--out DIR]
+        [--search] [--n-jobs N] [--cv K]
+        [--vectorizer tfidf|hashing] [--hash-features N] [--compare]
+        [--cache-dir DIR | --no-cache]
+
+The cleaned corpus and the fitted feature matrices are cached on disk
+(keyed on the dataset contents, preprocessing version, split and vectorizer
+settings), so re-runs only pay for the classifier fits. --search runs a
+cross-validated grid search over the classifiers' C values on all cores.
+
+Writes to --out: emotion_model.pkl, label_map.json, test_predictions.csv
+and metrics.json (plus vectorizer_report.json with --compare). --publish
+then exports emotion_model.npz (TF-IDF models, for EMOTION_ENGINE=compact)
+and adds them to the model registry (ml_model/registry.py) as the new
+active version, which running workers hot-swap to.
+"""
 import pandas as pd
 import numpy as np
 import json
 import joblib
+import io
+import time
+import hashlib
+import argparse
+import platform
 
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+import sklearn
+from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import VotingClassifier
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, log_loss, f1_score
 
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import re
+import sys
 import difflib
 from pathlib import Path
 
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE.parent))
+from ml_model.preprocessing import clean_text, PREPROCESSING_VERSION  # shared with tools/emotion_tool.py
+from ml_model import registry
+
+DEFAULT_DATA = BASE / "data" / "isear.csv"
+DEFAULT_CACHE_DIR = BASE / ".cache"
+
+# Search space for --search (keys are VotingClassifier params)
+PARAM_GRID = {
+    "log_reg__C": [0.3, 1, 3],
+    "svm__estimator__C": [0.1, 0.3, 1],
+}
+
+LABEL_MAP = {
+    "polarity_map": {
+        "joy": "positive",
+        "fear": "negative",
+        "anger": "negative",
+        "sadness": "negative",
+        "disgust": "negative",
+        "shame": "negative",
+        "guilt": "negative"
+    },
+    "risk_map": {
+        "joy": "low",
+        "fear": "medium",
+        "anger": "medium",
+        "sadness": "high",
+        "disgust": "medium",
+        "shame": "high",
+        "guilt": "high"
+    }
+}
+
+
 # =========================
-# NLTK setup
+# Options
 # =========================
-nltk.download("stopwords")
-nltk.download("wordnet")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the MindCare emotion model")
+    parser.add_argument("--data", default=str(DEFAULT_DATA),
+                        help="CSV with Content and Emotion columns (default: ml_model/data/isear.csv)")
+    parser.add_argument("--out", default=str(BASE),
+                        help="output directory for the model and reports (default: ml_model/)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                        help="on-disk cache for the cleaned corpus and feature matrices")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and don't write the cache")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel jobs for fitting/search (default: all cores)")
+    parser.add_argument("--search", action="store_true", help="grid-search the classifiers' C values")
+    parser.add_argument("--cv", type=int, default=3, help="folds for --search (default: 3)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    # --vectorizer hashing replaces the fitted 75k n-gram vocabulary dict with a
+    # stateless HashingVectorizer (+ a stored idf vector), so the pickle holds no
+    # per-term Python objects. --compare trains both and reports the trade-off.
+    # The coefficient matrices scale with the feature count, so the hashing
+    # space stays below the 75k TF-IDF vocabulary: on ISEAR 2**16 gives a
+    # 15 MB pickle (TF-IDF: 20 MB, 2**18: 61 MB) for -1.5 points of accuracy.
+    parser.add_argument("--vectorizer", choices=["tfidf", "hashing"], default="tfidf",
+                        help="feature extractor of the saved model (default: tfidf)")
+    parser.add_argument("--hash-features", type=int, default=2 ** 16,
+                        help="hashing space size for --vectorizer hashing (default: 2**16)")
+    parser.add_argument("--compare", action="store_true",
+                        help="train both vectorizers and write vectorizer_report.json")
+    parser.add_argument("--publish", action="store_true",
+                        help="publish the trained model to the registry and activate it")
+    return parser.parse_args(argv)
+
 
 # =========================
-# Load Dataset
+# Disk cache
 # =========================
-df = pd.read_csv("C:/Users/Dhruv/Desktop/mindcareai_project/ml_model/data/isear.csv")
+class StageCache:
+    """joblib files under cache_dir, one per stage key; disabled when cache_dir is None."""
 
-# normalize text and labels
-df["Content"] = df["Content"].astype(str)
-df["Emotion"] = df["Emotion"].astype(str).str.lower().str.strip()
+    def __init__(self, cache_dir):
+        self.dir = Path(cache_dir) if cache_dir else None
+        if self.dir:
+            self.dir.mkdir(parents=True, exist_ok=True)
 
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+    def get_or_compute(self, stage, key, compute):
+        path = self.dir / f"{stage}-{key}.joblib" if self.dir else None
+        if path and path.exists():
+            print(f"💾 Cache hit: {stage} ({path.name})")
+            return joblib.load(path)
+        start = time.perf_counter()
+        value = compute()
+        print(f"   {stage} computed in {time.perf_counter() - start:.1f}s")
+        if path:
+            joblib.dump(value, path)
+        return value
+
+
+# =========================
+# Load Dataset
+# =========================
 # fix simple typos in emotion labels
 _known = ["joy", "sadness", "anger", "fear", "shame", "disgust", "guilt"]
 
@@ -42,134 +153,268 @@ def _fix(lbl: str) -> str:
     m = difflib.get_close_matches(lbl, _known, n=1, cutoff=0.6)
     return m[0] if m else lbl
 
-df["Emotion"] = df["Emotion"].apply(_fix)
 
-# drop rows with missing text or labels
-df = df[df["Content"].notna() & df["Emotion"].notna() & (df["Emotion"] != "")].copy()
+def load_dataset(path):
+    df = pd.read_csv(path)
 
-# Iteratively drop labels with <2 examples
-while True:
-    label_counts = df["Emotion"].value_counts()
-    print("Label counts:\n", label_counts)
-    low_labels = label_counts[label_counts < 2].index.tolist()
-    if not low_labels:
-        break
-    print(f"Dropping labels with fewer than 2 examples: {low_labels}")
-    df = df[~df["Emotion"].isin(low_labels)].copy()
-    if df.empty:
-        raise ValueError("No data left after dropping rare labels.")
+    # normalize text and labels
+    df["Content"] = df["Content"].astype(str)
+    df["Emotion"] = df["Emotion"].astype(str).str.lower().str.strip()
+    df["Emotion"] = df["Emotion"].apply(_fix)
 
-texts = df["Content"].astype(str)
-labels = df["Emotion"].astype(str)
+    # drop rows with missing text or labels
+    df = df[df["Content"].notna() & df["Emotion"].notna() & (df["Emotion"] != "")].copy()
 
-# =========================
-# Preprocessing Function
-# =========================
-stop_words = set(stopwords.words("english"))
-lemmatizer = WordNetLemmatizer()
+    # Iteratively drop labels with <2 examples
+    while True:
+        label_counts = df["Emotion"].value_counts()
+        print("Label counts:\n", label_counts)
+        low_labels = label_counts[label_counts < 2].index.tolist()
+        if not low_labels:
+            break
+        print(f"Dropping labels with fewer than 2 examples: {low_labels}")
+        df = df[~df["Emotion"].isin(low_labels)].copy()
+        if df.empty:
+            raise ValueError("No data left after dropping rare labels.")
 
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r"http\S+|www\S+", "", text)  # remove URLs
-    text = re.sub(r"[^a-z\s]", "", text)        # remove punctuation/numbers
-    tokens = text.split()
-    tokens = [lemmatizer.lemmatize(w) for w in tokens if w not in stop_words]
-    return " ".join(tokens)
+    return df["Content"].astype(str).reset_index(drop=True), df["Emotion"].astype(str).reset_index(drop=True)
 
-texts_cleaned = texts.apply(clean_text)
 
 # =========================
-# Train/Test Split
+# Features
 # =========================
-counts = labels.value_counts()
-if any(counts < 2):
-    print("⚠️ Some classes have <2 samples → non-stratified split.")
-    strat_param = None
-else:
-    strat_param = labels
+def feature_steps(vectorizer, hash_features):
+    if vectorizer == "hashing":
+        # Stateless n-gram hashing; only the idf vector is learned
+        return [
+            ("hashing", HashingVectorizer(ngram_range=(1, 3), n_features=hash_features,
+                                          alternate_sign=False, norm=None)),
+            ("idf", TfidfTransformer()),
+        ]
+    return [("tfidf", TfidfVectorizer(ngram_range=(1, 3), max_features=75000))]
+
+
+def featurize(vectorizer, args, X_train, X_test, cache, split_key):
+    """Fit the feature steps on the training split; cached as (steps, X_train, X_test)."""
+    def compute():
+        features = Pipeline(feature_steps(vectorizer, args.hash_features))
+        Xtr = features.fit_transform(X_train)
+        return features.steps, Xtr, features.transform(X_test)
+
+    key = cache.key(split_key, vectorizer, args.hash_features if vectorizer == "hashing" else None)
+    return cache.get_or_compute(f"features-{vectorizer}", key, compute)
 
-X_train, X_test, y_train, y_test = train_test_split(
-    texts_cleaned, labels, test_size=0.2, stratify=strat_param, random_state=42
-)
 
 # =========================
-# Ensemble Pipeline
+# Ensemble
 # =========================
-tfidf = TfidfVectorizer(ngram_range=(1, 3), max_features=75000)
+def build_ensemble(n_jobs=None):
+    log_reg = LogisticRegression(max_iter=300, class_weight="balanced", C=1)
+    # LinearSVC has no predict_proba; sigmoid calibration turns its margins into
+    # probabilities so the ensemble can soft-vote and report real confidences.
+    svm = CalibratedClassifierCV(LinearSVC(C=1, class_weight="balanced"), method="sigmoid", cv=3)
 
-log_reg = LogisticRegression(max_iter=300, class_weight="balanced", C=1)
-svm = LinearSVC(C=1, class_weight="balanced")
+    return VotingClassifier(
+        estimators=[
+            ("log_reg", log_reg),
+            ("svm", svm),
+        ],
+        voting="soft",
+        n_jobs=n_jobs,
+    )
 
-ensemble = VotingClassifier(
-    estimators=[
-        ("log_reg", log_reg),
-        ("svm", svm),
-    ],
-    voting="hard"
-)
 
-pipeline = Pipeline([
-    ("tfidf", tfidf),
-    ("ensemble", ensemble)
-])
+def fit_ensemble(Xtr, y_train, args):
+    """Fit on the cached feature matrix; returns (ensemble, search report or None)."""
+    if not args.search:
+        # Fit the two members in parallel
+        ensemble = build_ensemble(n_jobs=args.n_jobs).fit(Xtr, y_train)
+        return ensemble.set_params(n_jobs=None), None
 
-# Train
-pipeline.fit(X_train, y_train)
+    n_candidates = int(np.prod([len(v) for v in PARAM_GRID.values()]))
+    print(f"🔍 Grid search: {n_candidates} candidates x {args.cv} folds on n_jobs={args.n_jobs}")
+    search = GridSearchCV(
+        build_ensemble(),
+        PARAM_GRID,
+        scoring="f1_macro",
+        cv=StratifiedKFold(n_splits=args.cv, shuffle=True, random_state=args.seed),
+        n_jobs=args.n_jobs,
+        refit=True,
+    )
+    search.fit(Xtr, y_train)
+    results = pd.DataFrame(search.cv_results_).sort_values("rank_test_score")
+    print(f"🏆 Best params: {search.best_params_} (cv macro-F1 {search.best_score_:.4f})")
+    report = {
+        "best_params": search.best_params_,
+        "best_cv_macro_f1": round(float(search.best_score_), 4),
+        "candidates": [
+            {"params": row.params, "mean_macro_f1": round(row.mean_test_score, 4),
+             "std": round(row.std_test_score, 4), "fit_s": round(row.mean_fit_time, 2)}
+            for row in results.itertuples()
+        ],
+    }
+    return search.best_estimator_, report
 
-# Predict
-y_pred = pipeline.predict(X_test)
 
-# =========================
-# Evaluation
-# =========================
-print("\n=== Classification Report (Ensemble) ===")
-print(classification_report(y_test, y_pred))
+def profile_pipeline(pipeline, y_proba, X_test, y_test):
+    """Accuracy / memory / latency figures for the vectorizer comparison."""
+    y_pred = pipeline.classes_[y_proba.argmax(axis=1)]
+    buf = io.BytesIO()
+    joblib.dump(pipeline, buf)
+    blob = buf.getvalue()
 
-print("\n=== Confusion Matrix (Ensemble) ===")
-print(confusion_matrix(y_test, y_pred))
+    start = time.perf_counter()
+    loaded = joblib.load(io.BytesIO(blob))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    sample = list(X_test[:300])
+    start = time.perf_counter()
+    for text in sample:
+        loaded.predict_proba([text])
+    single_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    vocab = getattr(pipeline[0], "vocabulary_", None)
+    return {
+        "accuracy": round(accuracy_score(y_test, y_pred), 4),
+        "macro_f1": round(f1_score(y_test, y_pred, average="macro"), 4),
+        "log_loss": round(log_loss(y_test, y_proba, labels=pipeline.classes_), 4),
+        "pickle_mb": round(len(blob) / 1e6, 2),
+        "unpickle_ms": round(load_ms, 1),
+        "predict_single_ms": round(single_ms, 3),
+        "vocabulary_entries": len(vocab) if vocab is not None else 0,
+    }
 
-acc = accuracy_score(y_test, y_pred)
-print(f"\n🎯 Final Test Accuracy (Ensemble): {acc:.4f}")
 
 # =========================
-# Save Model & Metadata
+# Main
 # =========================
-# Ensure output directory exists (ml_model folder next to this script)
-out_dir = Path(__file__).resolve().parent
-out_dir.mkdir(parents=True, exist_ok=True)
-model_path = out_dir / "emotion_model.pkl"
-label_map_path = out_dir / "label_map.json"
-test_preds_path = out_dir / "test_predictions.csv"
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    cache = StageCache(None if args.no_cache else args.cache_dir)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-joblib.dump(pipeline, model_path)
-print(f"Saved model to {model_path}")
+    texts, labels = load_dataset(args.data)
+    data_digest = registry.file_sha256(args.data)
 
-label_map = {
-    "polarity_map": {
-        "joy": "positive",
-        "fear": "negative",
-        "anger": "negative",
-        "sadness": "negative",
-        "disgust": "negative",
-        "shame": "negative",
-        "guilt": "negative"
-    },
-    "risk_map": {
-        "joy": "low",
-        "fear": "medium",
-        "anger": "medium",
-        "sadness": "high",
-        "disgust": "medium",
-        "shame": "high",
-        "guilt": "high"
+    # Preprocessing (ml_model/preprocessing.py), cached per dataset + preprocessing version
+    texts_cleaned = cache.get_or_compute(
+        "corpus", cache.key(data_digest, PREPROCESSING_VERSION),
+        lambda: [clean_text(t) for t in texts],
+    )
+    texts_cleaned = pd.Series(texts_cleaned, index=texts.index)
+
+    # Train/Test Split
+    counts = labels.value_counts()
+    if any(counts < 2):
+        print("⚠️ Some classes have <2 samples → non-stratified split.")
+        strat_param = None
+    else:
+        strat_param = labels
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts_cleaned, labels, test_size=args.test_size, stratify=strat_param, random_state=args.seed
+    )
+    split_key = (data_digest, PREPROCESSING_VERSION, args.test_size, args.seed)
+
+    trained, search_reports = {}, {}
+    for name in (["tfidf", "hashing"] if args.compare else [args.vectorizer]):
+        print(f"\n🏋️  Training ensemble with {name} features...")
+        steps, Xtr, Xte = featurize(name, args, X_train, X_test, cache, split_key)
+        ensemble, search_reports[name] = fit_ensemble(Xtr, y_train, args)
+        model = Pipeline(steps + [("ensemble", ensemble)])
+        # One probability pass on the cached test matrix, same as inference
+        trained[name] = (model, ensemble.predict_proba(Xte))
+
+    pipeline, y_proba = trained[args.vectorizer]
+    y_pred = pipeline.classes_[y_proba.argmax(axis=1)]
+    y_conf = y_proba.max(axis=1)
+
+    # =========================
+    # Evaluation
+    # =========================
+    print("\n=== Classification Report (Ensemble) ===")
+    print(classification_report(y_test, y_pred))
+
+    print("\n=== Confusion Matrix (Ensemble) ===")
+    print(confusion_matrix(y_test, y_pred, labels=pipeline.classes_))
+
+    acc = accuracy_score(y_test, y_pred)
+    loss = log_loss(y_test, y_proba, labels=pipeline.classes_)
+    print(f"\n🎯 Final Test Accuracy (Ensemble): {acc:.4f}")
+    print(f"📉 Test Log Loss (calibration): {loss:.4f}")
+    print(f"📊 Mean confidence: {y_conf.mean():.4f} (correct: {y_conf[y_pred == y_test].mean():.4f}, "
+          f"wrong: {y_conf[y_pred != y_test].mean():.4f})")
+
+    # =========================
+    # Save Model & Metadata
+    # =========================
+    model_path = out_dir / "emotion_model.pkl"
+    label_map_path = out_dir / "label_map.json"
+    test_preds_path = out_dir / "test_predictions.csv"
+    metrics_path = out_dir / "metrics.json"
+
+    joblib.dump(pipeline, model_path)
+    print(f"Saved model to {model_path}")
+
+    with open(label_map_path, "w", encoding="utf-8") as f:
+        json.dump(LABEL_MAP, f, indent=4)
+
+    # save test predictions
+    results_df = pd.DataFrame({"text": X_test, "gold": y_test, "pred": y_pred, "confidence": y_conf})
+    results_df.to_csv(test_preds_path, index=False)
+
+    metrics = {
+        "trained_at": pd.Timestamp.utcnow().isoformat(),
+        "data": {"path": str(args.data), "sha256": data_digest, "rows": len(texts),
+                 "train": len(X_train), "test": len(X_test)},
+        "vectorizer": args.vectorizer,
+        "hash_features": args.hash_features if args.vectorizer == "hashing" else None,
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "params": {k: v for k, v in pipeline[-1].get_params().items() if k.endswith("__C")},
+        "search": search_reports.get(args.vectorizer),
+        "accuracy": round(acc, 4),
+        "macro_f1": round(f1_score(y_test, y_pred, average="macro"), 4),
+        "log_loss": round(loss, 4),
+        "mean_confidence": round(float(y_conf.mean()), 4),
+        "classes": list(pipeline.classes_),
+        "per_class": classification_report(y_test, y_pred, output_dict=True),
+        "confusion_matrix": confusion_matrix(y_test, y_pred, labels=pipeline.classes_).tolist(),
+        "train_seconds": round(time.perf_counter() - started, 1),
+        "versions": {"python": platform.python_version(), "sklearn": sklearn.__version__},
     }
-}
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=4, default=str)
+    print(f"Saved metrics to {metrics_path}")
+
+    if args.compare:
+        report = {name: profile_pipeline(model, proba, X_test, y_test) for name, (model, proba) in trained.items()}
+        report["hash_features"] = args.hash_features
+        report["saved"] = args.vectorizer
+        print("\n=== Vectorizer comparison ===")
+        print(f"{'':10}" + "".join(f"{k:>20}" for k in report["tfidf"]))
+        for name in ("tfidf", "hashing"):
+            print(f"{name:10}" + "".join(f"{v:>20}" for v in report[name].values()))
+        with open(out_dir / "vectorizer_report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved comparison to {out_dir / 'vectorizer_report.json'}")
 
-with open(label_map_path, "w", encoding="utf-8") as f:
-    json.dump(label_map, f, indent=4)
+    print(f"\n✅ Ensemble model, label_map.json, test_predictions.csv and metrics.json saved to {out_dir}!")
+    if args.publish:
+        if args.vectorizer == "tfidf":
+            # Compact export of this very model, so EMOTION_ENGINE=compact
+            # serves the same model under the new version
+            from ml_model.export_compact_model import export
+            export(model_path, out_dir / "emotion_model.npz")
+        else:
+            print("ℹ️  Hashing models have no compact export; this version needs EMOTION_ENGINE=sklearn")
+        metrics["registry_version"] = registry.publish(out_dir)
+        # Keep the local metrics.json in step with the published copy
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=4, default=str)
+    return metrics
 
-# save test predictions
-results_df = pd.DataFrame({"text": X_test, "gold": y_test, "pred": y_pred})
-results_df.to_csv(test_preds_path, index=False)
 
-print(f"\n✅ Ensemble model, label_map.json, and test_predictions.csv saved to {out_dir}!")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+# mongo_repository.py
+"""
+pymongo implementation of repository.Repository.
+
+Also holds the Mongo-specific document helpers (indexes, message buckets,
+history and archival queries).
+"""
+import os
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel, UpdateOne, ReplaceOne, DeleteOne, ReturnDocument
+from pymongo.errors import ClientBulkWriteException, InvalidOperation
+
+from repository import (
+    Repository, clamp_page_size, decode_history_cursor, finish_history_page,
+    merge_history_pages, compact_messages, expand_messages,
+)
+
+DB_NAME = "mindcare_ai"
+
+# Messages are stored MESSAGE_BUCKET_SIZE per document in session_messages,
+# keyed by (session_id, bucket). A message's `seq` is its position in the
+# session and its bucket is seq // MESSAGE_BUCKET_SIZE. Session documents only
+# keep a `message_count`, so they stay small and never grow with the chat.
+MESSAGE_BUCKET_SIZE = int(os.getenv("MESSAGE_BUCKET_SIZE", 50))
+
+DUPLICATE_KEY = 11000
+
+# --- Indexes ---
+# Declared once here and applied at service startup (see ensure_indexes).
+# _id lookups are covered by Mongo's default index.
+INDEXES = {
+    "sessions": [
+        # History lookups: find({"user_id": ...}) newest-first
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+        # Admin queries: unsent summaries / sessions by risk level
+        IndexModel([("emailed", ASCENDING), ("created_at", DESCENDING)], name="emailed_created_at"),
+        IndexModel([("risk", ASCENDING), ("created_at", DESCENDING)], name="risk_created_at"),
+        # Archival scans by last activity (legacy sessions: updated_at null)
+        IndexModel([("updated_at", ASCENDING), ("created_at", ASCENDING)], name="updated_at_created_at"),
+    ],
+    "sessions_archive": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "session_messages": [
+        # One document per (session, bucket); also serves bucket range reads
+        IndexModel([("session_id", ASCENDING), ("bucket", ASCENDING)], name="session_id_bucket", unique=True),
+    ],
+    "users": [],
+}
+
+# --- History queries ---
+SESSION_SUMMARY_PROJECTION = {
+    "user_id": 1,
+    "custom_email": 1,
+    "summary": 1,
+    "risk": 1,
+    "emailed": 1,
+    "created_at": 1,
+    "archived_at": 1,
+    # Legacy sessions still carry an embedded messages array
+    "message_count": {"$add": [
+        {"$ifNull": ["$message_count", 0]},
+        {"$size": {"$ifNull": ["$messages", []]}},
+    ]},
+}
+
+HISTORY_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+
+def history_page_query(user_id, cursor=None):
+    """Filter for one page of a user's sessions, keyset-paginated on (created_at, _id)."""
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, last_id = decode_history_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    return query
+
+
+# --- Message buckets ---
+def bucket_writes(session_id, start_seq, messages, namespace=None):
+    """
+    Upserts appending `messages` (numbered from start_seq) to their buckets.
+    Returns a list of UpdateOne ops for a single bulk_write (pass the
+    "db.collection" namespace for a client-level MongoClient.bulk_write).
+    """
+    by_bucket = {}
+    for offset, msg in enumerate(messages):
+        seq = start_seq + offset
+        by_bucket.setdefault(seq // MESSAGE_BUCKET_SIZE, []).append(dict(msg, seq=seq))
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"session_id": session_id, "bucket": bucket},
+            {
+                "$push": {"messages": {"$each": msgs}},
+                "$inc": {"count": len(msgs)},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            namespace=namespace,
+        )
+        for bucket, msgs in by_bucket.items()
+    ]
+
+
+def reserve_seq_update(count, fields=None):
+    """Session update that reserves `count` sequence numbers (and $sets fields)."""
+    return {
+        "$inc": {"message_count": count},
+        "$set": dict(fields or {}, updated_at=datetime.utcnow()),
+    }
+
+
+def stale_sessions_query(finished_before, abandoned_before):
+    """Mongo form of repository.is_stale (risk stays None until the session finishes)."""
+    def idle_since(cutoff):
+        return {"$or": [
+            {"updated_at": {"$lt": cutoff}},
+            {"updated_at": None, "created_at": {"$lt": cutoff}},
+        ]}
+    return {"$or": [
+        {"$and": [{"risk": {"$ne": None}}, idle_since(finished_before)]},
+        {"$and": [{"risk": None}, idle_since(abandoned_before)]},
+    ]}
+
+
+def bucket_range_query(session_id, start=0, end=None):
+    """Filter selecting only the buckets that hold seq in [start, end)."""
+    bucket = {"$gte": start // MESSAGE_BUCKET_SIZE}
+    if end is not None:
+        bucket["$lte"] = max(end - 1, start) // MESSAGE_BUCKET_SIZE
+    return {"session_id": session_id, "bucket": bucket}
+
+
+def collect_bucket_messages(bucket_docs, start=0, end=None):
+    """Flatten bucket documents into seq-ordered messages within [start, end)."""
+    out = [
+        m for doc in bucket_docs for m in doc.get("messages", [])
+        if m["seq"] >= start and (end is None or m["seq"] < end)
+    ]
+    out.sort(key=lambda m: m["seq"])
+    return out
+
+
+# --- Repository ---
+class MongoRepository(Repository):
+    def __init__(self, uri, db_name=DB_NAME):
+        # MongoClient connects in the background; nothing blocks here
+        self.client = MongoClient(uri)
+        self.db = self.client[db_name]
+        self.users_col = self.db["users"]
+        self.sessions_col = self.db["sessions"]
+        self.messages_col = self.db["session_messages"]  # bucketed session messages
+        self.archive_col = self.db["sessions_archive"]    # cold storage, see archive_sessions
+        # MongoClient.bulk_write needs MongoDB 8.0+; cleared on older servers
+        self.client_bulk_write = True
+
+    def ensure_indexes(self):
+        """
+        Create any missing indexes declared in INDEXES.
+        Safe to call on every startup: existing indexes are left untouched.
+        Returns {collection_name: [index names]}.
+        """
+        created = {}
+        for col_name, models in INDEXES.items():
+            if models:
+                created[col_name] = self.db[col_name].create_indexes(models)
+        return created
+
+    # Users
+    def insert_user_if_missing(self, user):
+        return self.users_col.find_one_and_update(
+            {"_id": user["_id"]},
+            {"$setOnInsert": {k: v for k, v in user.items() if k != "_id"}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def find_user(self, user_id):
+        return self.users_col.find_one({"_id": user_id})
+
+    def update_user(self, user_id, fields):
+        return self.users_col.find_one_and_update(
+            {"_id": user_id}, {"$set": fields}, return_document=ReturnDocument.AFTER,
+        )
+
+    # Sessions
+    def insert_session(self, session, messages):
+        self.sessions_col.insert_one(dict(session, message_count=len(messages), updated_at=session["created_at"]))
+        if messages:
+            self.messages_col.bulk_write(bucket_writes(session["_id"], 0, messages), ordered=False)
+
+    def append_messages(self, session_id, messages, fields=None, start_seq=None):
+        """
+        With start_seq (the message_count the caller just read): one round
+        trip, see _append_at. Otherwise, or when another writer moved the
+        counter meanwhile, two: reserve seq numbers on the session (applying
+        any $set fields), then one bulk_write to the touched buckets.
+        """
+        if start_seq is not None and self.client_bulk_write:
+            appended = self._append_at(session_id, start_seq, messages, fields)
+            if appended is not None:
+                return appended
+        before = self.sessions_col.find_one_and_update(
+            {"_id": session_id},
+            reserve_seq_update(len(messages), fields),
+            projection={"message_count": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            return False
+        self.messages_col.bulk_write(
+            bucket_writes(session_id, before.get("message_count", 0), messages),
+            ordered=False,
+        )
+        return True
+
+    def _append_at(self, session_id, start_seq, messages, fields):
+        """
+        Counter update and bucket writes in one ordered MongoClient.bulk_write.
+
+        The counter update only matches while message_count is still
+        start_seq; otherwise its upsert collides with the existing _id and
+        the ordered batch stops before any bucket is written. Returns None on
+        that conflict (the caller reserves fresh seq numbers), False if the
+        session no longer exists, True once appended.
+        """
+        sessions_ns = f"{self.db.name}.{self.sessions_col.name}"
+        gate = UpdateOne(
+            {"_id": session_id, "message_count": start_seq},
+            reserve_seq_update(len(messages), fields),
+            upsert=True,
+            namespace=sessions_ns,
+        )
+        buckets = bucket_writes(session_id, start_seq, messages, namespace=f"{self.db.name}.{self.messages_col.name}")
+        try:
+            result = self.client.bulk_write([gate] + buckets, ordered=True, verbose_results=True)
+        except InvalidOperation:
+            print("⚠️  MongoDB < 8.0: no MongoClient.bulk_write, appending in two round trips")
+            self.client_bulk_write = False
+            return None
+        except ClientBulkWriteException as e:
+            errors = e.write_errors or []
+            if errors and errors[0].get("idx") == 0 and errors[0].get("code") == DUPLICATE_KEY:
+                return None
+            raise
+        if result.update_results[0].upserted_id is not None:
+            # The session was deleted (archived) after the caller read it:
+            # undo the stub the gate inserted and the buckets written with it
+            self.sessions_col.delete_one({"_id": session_id, "user_id": {"$exists": False}})
+            self.messages_col.delete_many({"session_id": session_id})
+            return False
+        return True
+
+    def update_session(self, session_id, fields):
+        self.sessions_col.update_one({"_id": session_id}, {"$set": dict(fields, updated_at=datetime.utcnow())})
+
+    def find_session(self, session_id, fields=None):
+        projection = {f: 1 for f in fields} if fields else None
+        return self.sessions_col.find_one({"_id": session_id}, projection)
+
+    def find_session_messages(self, session_id, start=0, end=None):
+        if end is not None and end <= start:
+            return []
+        docs = self.messages_col.find(
+            bucket_range_query(session_id, start, end), {"messages": 1}
+        ).sort("bucket", ASCENDING)
+        return collect_bucket_messages(docs, start, end)
+
+    def find_user_sessions(self, user_id, limit, cursor=None, include_archived=False):
+        limit = clamp_page_size(limit)
+        query = history_page_query(user_id, cursor)
+        live = list(self.sessions_col.find(query, SESSION_SUMMARY_PROJECTION).sort(HISTORY_SORT).limit(limit + 1))
+        if not include_archived:
+            return finish_history_page(live, limit)
+        archived = list(self.archive_col.find(query, SESSION_SUMMARY_PROJECTION).sort(HISTORY_SORT).limit(limit + 1))
+        return merge_history_pages(live, archived, limit)
+
+    def find_user_session(self, user_id, session_id, include_messages=True):
+        projection = None if include_messages else SESSION_SUMMARY_PROJECTION
+        query = {"_id": session_id, "user_id": user_id}
+        doc = self.sessions_col.find_one(query, projection)
+        if doc:
+            doc["session_id"] = doc["_id"]
+            if include_messages:
+                # Legacy sessions keep their earlier messages embedded in the document
+                doc["messages"] = doc.get("messages", []) + self.find_session_messages(session_id)
+                doc["message_count"] = len(doc["messages"])
+            return doc
+
+        doc = self.archive_col.find_one(query, projection)
+        if not doc:
+            return None
+        doc["session_id"] = doc["_id"]
+        compact = doc.pop("compact_messages", [])
+        if include_messages:
+            doc["messages"] = expand_messages(compact)
+        return doc
+
+    # Lifecycle
+    def archive_sessions(self, finished_before, abandoned_before, batch_size=200):
+        """
+        Move stale sessions, batch by batch, into sessions_archive as single
+        documents with compact_messages, then delete the live session and its
+        buckets. Each step is idempotent, so an interrupted run is safely
+        resumed by the next one (readers prefer the live copy meanwhile).
+
+        A live session is only deleted if it is unchanged since it was copied
+        (same updated_at and message_count): a message or finish landing in
+        between keeps it live, and its archive copy is dropped again. Buckets
+        are deleted only for sessions that were actually removed.
+        """
+        moved = 0
+        query = stale_sessions_query(finished_before, abandoned_before)
+        while True:
+            sessions = list(self.sessions_col.find(query).limit(batch_size))
+            if not sessions:
+                return moved
+            ids = [s["_id"] for s in sessions]
+
+            buckets = {}
+            for doc in self.messages_col.find({"session_id": {"$in": ids}}).sort("bucket", ASCENDING):
+                buckets.setdefault(doc["session_id"], []).append(doc)
+
+            now = datetime.utcnow()
+            ops = []
+            for session in sessions:
+                messages = session.pop("messages", []) + collect_bucket_messages(buckets.get(session["_id"], []))
+                archived = dict(session, compact_messages=compact_messages(messages),
+                                message_count=len(messages), archived_at=now)
+                ops.append(ReplaceOne({"_id": session["_id"]}, archived, upsert=True))
+            self.archive_col.bulk_write(ops, ordered=False)
+
+            self.sessions_col.bulk_write([
+                DeleteOne({"_id": s["_id"], "updated_at": s.get("updated_at"), "message_count": s.get("message_count")})
+                for s in sessions
+            ], ordered=False)
+            kept = {s["_id"] for s in self.sessions_col.find({"_id": {"$in": ids}}, {"_id": 1})}
+            if kept:
+                self.archive_col.delete_many({"_id": {"$in": list(kept)}})
+            removed = [i for i in ids if i not in kept]
+            if removed:
+                self.messages_col.delete_many({"session_id": {"$in": removed}})
+            moved += len(removed)
@@ -0,0 +1,346 @@
+# repository.py
+"""
+Storage interface behind database.py, plus an in-memory implementation.
+
+database.py keeps the public functions (get_user, create_session, ...) and
+delegates the actual storage to a Repository selected by DB_BACKEND:
+
+    DB_BACKEND=mongo   (default) MongoRepository, see mongo_repository.py
+    DB_BACKEND=memory  InMemoryRepository: no outside services needed
+
+The in-memory backend can inject per-round-trip latency so the whole app can
+be load tested on a laptop with realistic database timings:
+
+    MEMORY_DB_LATENCY_MS   mean latency per simulated round trip (default 0)
+    MEMORY_DB_JITTER_MS    standard deviation of that latency (default 0)
+
+Both backends archive stale sessions to a cold store (archive_sessions) and
+can page through it together with live sessions (include_archived=True).
+"""
+import os
+import copy
+import json
+import time
+import base64
+import random
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- Shared document helpers (used by every backend) ---
+DEFAULT_HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+# Summary metadata returned by history listings; full messages are opt-in
+# per session.
+SESSION_SUMMARY_FIELDS = (
+    "user_id", "custom_email", "summary", "risk", "emailed", "created_at", "message_count", "archived_at",
+)
+
+
+def new_message(role, text):
+    return {"role": role, "text": text, "ts": datetime.utcnow()}
+
+
+def compact_messages(messages):
+    """Archive form of a message list: seq-ordered [role, text, ts] triples."""
+    return [[m.get("role"), m.get("text"), m.get("ts")] for m in messages]
+
+
+def expand_messages(compact):
+    """Inverse of compact_messages."""
+    return [{"role": role, "text": text, "ts": ts, "seq": seq} for seq, (role, text, ts) in enumerate(compact)]
+
+
+def is_stale(session, finished_before, abandoned_before):
+    """
+    Archival policy: finished sessions (risk set by save_summary) idle since
+    before finished_before, and unfinished ones idle since before abandoned_before.
+    """
+    last_active = session.get("updated_at") or session["created_at"]
+    cutoff = abandoned_before if session.get("risk") is None else finished_before
+    return last_active < cutoff
+
+
+def encode_history_cursor(session):
+    """Opaque cursor pointing just past `session` in newest-first order."""
+    raw = json.dumps({"t": session["created_at"].isoformat(), "id": session["_id"]})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_history_cursor(cursor):
+    """Inverse of encode_history_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), data["id"]
+    except Exception as e:
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from e
+
+
+def clamp_page_size(limit):
+    return max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+
+
+def _history_key(doc):
+    return doc["created_at"], doc["_id"]
+
+
+def merge_history_pages(live, archived, limit):
+    """
+    Merge over-fetched newest-first pages from the live and archive stores
+    into one page. A session present in both (interrupted archival run) is
+    reported once, from the live store.
+    """
+    seen = {doc["_id"] for doc in live}
+    merged = live + [doc for doc in archived if doc["_id"] not in seen]
+    merged.sort(key=_history_key, reverse=True)
+    return finish_history_page(merged[:limit + 1], limit)
+
+
+def finish_history_page(docs, limit):
+    """Trim an over-fetched (limit + 1) page and compute the next cursor."""
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    for doc in docs:
+        doc["session_id"] = doc["_id"]
+    next_cursor = encode_history_cursor(docs[-1]) if has_more and docs else None
+    return docs, next_cursor
+
+
+# --- Interface ---
+class Repository:
+    """
+    Storage operations used by database.py. Documents are plain dicts shaped
+    like the Mongo documents (sessions keyed by "_id", messages carry "seq").
+    """
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        return {}
+
+    # Users
+    def insert_user_if_missing(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert the user unless one with its _id exists; returns the stored user."""
+        raise NotImplementedError
+
+    def find_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update_user(self, user_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """$set fields on a user; returns the updated user, or None if it doesn't exist."""
+        raise NotImplementedError
+
+    # Sessions
+    def insert_session(self, session: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, Any]],
+                        fields: Optional[Dict[str, Any]] = None, start_seq: Optional[int] = None) -> bool:
+        """
+        Append messages (and $set fields) to a session; False if it doesn't exist.
+        start_seq is the session's message_count as the caller last read it
+        (find_session); it lets the write go out in one round trip, and
+        falls back to reserving fresh seq numbers if the count moved since.
+        """
+        raise NotImplementedError
+
+    def update_session(self, session_id: str, fields: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def find_session(self, session_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def find_session_messages(self, session_id: str, start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def find_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None,
+                           include_archived: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        raise NotImplementedError
+
+    def find_user_session(self, user_id: str, session_id: str,
+                          include_messages: bool = True) -> Optional[Dict[str, Any]]:
+        """A live session, or failing that an archived one."""
+        raise NotImplementedError
+
+    # Lifecycle
+    def archive_sessions(self, finished_before: datetime, abandoned_before: datetime) -> int:
+        """Move stale sessions (see is_stale) to the archive; returns how many moved."""
+        raise NotImplementedError
+
+
+# --- In-memory backend ---
+class InMemoryRepository(Repository):
+    """
+    Dict-backed Repository for benchmarks and local runs without Mongo.
+
+    Each method sleeps once per round trip the Mongo backend would make
+    (latency_ms ± jitter_ms, normally distributed, never negative), so timings
+    under load stay comparable. `round_trips` counts the simulated calls.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.round_trips = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._messages: Dict[str, List[Dict[str, Any]]] = {}
+        self._archive: Dict[str, Dict[str, Any]] = {}
+
+    def _round_trip(self, count: int = 1):
+        with self._lock:
+            self.round_trips += count
+            delays = [max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) for _ in range(count)]
+        # Sleep outside the lock so concurrent requests overlap like real I/O
+        total = sum(delays)
+        if total > 0:
+            time.sleep(total / 1000)
+
+    # Users
+    def insert_user_if_missing(self, user):
+        self._round_trip()
+        with self._lock:
+            return copy.deepcopy(self._users.setdefault(user["_id"], copy.deepcopy(user)))
+
+    def find_user(self, user_id):
+        self._round_trip()
+        with self._lock:
+            user = self._users.get(user_id)
+            return copy.deepcopy(user) if user is not None else None
+
+    def update_user(self, user_id, fields):
+        self._round_trip()
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            user.update(copy.deepcopy(fields))
+            return copy.deepcopy(user)
+
+    # Sessions
+    def insert_session(self, session, messages):
+        self._round_trip(2 if messages else 1)
+        with self._lock:
+            doc = copy.deepcopy(session)
+            doc["message_count"] = len(messages)
+            doc.setdefault("updated_at", doc["created_at"])
+            self._sessions[doc["_id"]] = doc
+            self._messages[doc["_id"]] = [dict(m, seq=i) for i, m in enumerate(copy.deepcopy(messages))]
+
+    def append_messages(self, session_id, messages, fields=None, start_seq=None):
+        self._round_trip()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            start = session.get("message_count", 0)
+            if start_seq is not None and start_seq != start:
+                # Counter moved since the caller read it: reserve, then write
+                start_seq = None
+                self._round_trip()
+            session["message_count"] = start + len(messages)
+            session["updated_at"] = datetime.utcnow()
+            if fields:
+                session.update(copy.deepcopy(fields))
+            stored = self._messages.setdefault(session_id, [])
+            stored.extend(dict(m, seq=start + i) for i, m in enumerate(copy.deepcopy(messages)))
+        if start_seq is None:
+            self._round_trip()
+        return True
+
+    def update_session(self, session_id, fields):
+        self._round_trip()
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id].update(copy.deepcopy(fields), updated_at=datetime.utcnow())
+
+    def find_session(self, session_id, fields=None):
+        self._round_trip()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if fields:
+                return {"_id": session_id, **{f: copy.deepcopy(session[f]) for f in fields if f in session}}
+            return copy.deepcopy(session)
+
+    def find_session_messages(self, session_id, start=0, end=None):
+        if end is not None and end <= start:
+            return []
+        self._round_trip()
+        with self._lock:
+            msgs = self._messages.get(session_id, [])
+            return copy.deepcopy(msgs[start:end])
+
+    def _summary(self, session):
+        doc = {"_id": session["_id"]}
+        doc.update({f: copy.deepcopy(session.get(f)) for f in SESSION_SUMMARY_FIELDS})
+        return doc
+
+    def _history_page(self, store, user_id, limit, after):
+        self._round_trip()
+        with self._lock:
+            owned = [s for s in store.values() if s["user_id"] == user_id]
+            owned.sort(key=_history_key, reverse=True)
+            if after is not None:
+                owned = [s for s in owned if _history_key(s) < after]
+            return [self._summary(s) for s in owned[:limit + 1]]
+
+    def find_user_sessions(self, user_id, limit, cursor=None, include_archived=False):
+        limit = clamp_page_size(limit)
+        after = decode_history_cursor(cursor) if cursor else None
+        live = self._history_page(self._sessions, user_id, limit, after)
+        if not include_archived:
+            return finish_history_page(live, limit)
+        archived = self._history_page(self._archive, user_id, limit, after)
+        return merge_history_pages(live, archived, limit)
+
+    def find_user_session(self, user_id, session_id, include_messages=True):
+        self._round_trip()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            archived = None
+            if session is None:
+                archived = self._archive.get(session_id)
+            found = session or archived
+            if found is None or found["user_id"] != user_id:
+                return None
+            doc = copy.deepcopy(found) if include_messages else self._summary(found)
+        doc["session_id"] = doc["_id"]
+        if archived is not None:
+            compact = doc.pop("compact_messages", [])
+            if include_messages:
+                doc["messages"] = expand_messages(compact)
+        elif include_messages:
+            doc["messages"] = self.find_session_messages(session_id)
+        return doc
+
+    def archive_sessions(self, finished_before, abandoned_before):
+        self._round_trip(4)  # find, bucket read, archive write, deletes
+        now = datetime.utcnow()
+        with self._lock:
+            stale = [s for s in self._sessions.values() if is_stale(s, finished_before, abandoned_before)]
+            for session in stale:
+                messages = self._messages.pop(session["_id"], [])
+                archived = dict(session, compact_messages=compact_messages(messages),
+                                message_count=len(messages), archived_at=now)
+                self._archive[session["_id"]] = archived
+                del self._sessions[session["_id"]]
+        return len(stale)
+
+
+# --- Factory ---
+def create_repository(backend: Optional[str] = None) -> Repository:
+    """Build the Repository named by `backend` (defaults to $DB_BACKEND, then "mongo")."""
+    backend = (backend or os.getenv("DB_BACKEND", "mongo")).lower()
+    if backend == "memory":
+        return InMemoryRepository(
+            latency_ms=float(os.getenv("MEMORY_DB_LATENCY_MS", 0)),
+            jitter_ms=float(os.getenv("MEMORY_DB_JITTER_MS", 0)),
+        )
+    if backend == "mongo":
+        # Imported lazily so the memory backend never needs pymongo/Mongo
+        from mongo_repository import MongoRepository
+        return MongoRepository(os.getenv("MONGO_URI"))
+    raise ValueError(f"Unknown DB_BACKEND {backend!r} (expected 'mongo' or 'memory')")
@@ -0,0 +1,79 @@
+# tests/test_compact_model.py
+"""
+Parity of the compact NumPy scorer (tools/compact_emotion.py) with the
+sklearn pipeline it is compiled from, on a tiny model trained on synthetic
+text with the same feature step and ensemble as train_emotion_model.py.
+"""
+import json
+import random
+import hashlib
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.pipeline import Pipeline
+
+from ml_model.export_compact_model import compile_pipeline, export
+from ml_model.train_emotion_model import build_ensemble, feature_steps
+from tools.compact_emotion import CompactEmotionModel
+
+WORDS = {
+    "joy": ["happy", "great", "smile", "party", "won", "laughing"],
+    "sadness": ["cried", "lost", "alone", "grief", "missed", "funeral"],
+    "anger": ["furious", "shouted", "unfair", "yelled", "cheated", "rage"],
+    "fear": ["scared", "dark", "panic", "shaking", "threat", "nightmare"],
+}
+FILLER = ["i", "was", "when", "my", "the", "at", "felt", "friend", "day", "it"]
+
+
+def synthetic_texts(n, seed):
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for i in range(n):
+        label = list(WORDS)[i % len(WORDS)]
+        words = rng.sample(WORDS[label], 2) + rng.sample(FILLER, 4)
+        # a word from another emotion keeps the probabilities away from 0/1
+        words.append(rng.choice(WORDS[rng.choice(list(WORDS))]))
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+        labels.append(label)
+    return texts, labels
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    texts, labels = synthetic_texts(120, seed=0)
+    model = Pipeline(feature_steps("tfidf", None) + [("ensemble", build_ensemble())])
+    return model.fit(texts, labels)
+
+
+def test_compact_model_matches_sklearn(pipeline, tmp_path):
+    model_path, compact_path = tmp_path / "emotion_model.pkl", tmp_path / "emotion_model.npz"
+    joblib.dump(pipeline, model_path)
+    export(model_path, compact_path)
+    compact = CompactEmotionModel(compact_path)
+
+    # unseen texts, plus out-of-vocabulary and empty input
+    texts = synthetic_texts(60, seed=1)[0] + ["completely unknown words here", ""]
+    expected = pipeline.predict_proba(texts)
+    got = compact.predict_proba(texts)
+
+    assert list(compact.classes_) == list(pipeline.classes_)
+    assert np.array_equal(got.argmax(axis=1), expected.argmax(axis=1))
+    assert np.allclose(got, expected, rtol=0, atol=1e-9)
+
+
+def test_export_records_its_source(pipeline, tmp_path):
+    model_path, compact_path = tmp_path / "emotion_model.pkl", tmp_path / "emotion_model.npz"
+    joblib.dump(pipeline, model_path)
+    export(model_path, compact_path)
+    with np.load(compact_path, allow_pickle=False) as data:
+        spec = json.loads(str(data["spec"]))
+    assert spec["source_sha256"] == hashlib.sha256(model_path.read_bytes()).hexdigest()
+
+
+def test_hashing_models_are_rejected():
+    texts, labels = synthetic_texts(40, seed=2)
+    model = Pipeline(feature_steps("hashing", 2 ** 10) + [("ensemble", build_ensemble())]).fit(texts, labels)
+    with pytest.raises(ValueError):
+        compile_pipeline(model)
@@ -0,0 +1,69 @@
+# tests/test_session_turn.py
+"""
+Round trips per /session/respond turn, counted by InMemoryRepository.
+
+respond() reads the session once (custom_email + message_count) and
+commits the turn through SessionTurn; a turn should cost at most 2 round
+trips whether or not it finishes the session.
+"""
+import pytest
+
+import database
+from repository import InMemoryRepository
+
+TURN_FIELDS = ["custom_email", "message_count"]
+
+
+@pytest.fixture
+def repo():
+    repo = InMemoryRepository()
+    database.set_repository(repo)
+    database.create_session("s1", "u1", initial_messages=[("assistant", "Hi")])
+    yield repo
+    database.set_repository(None)
+
+
+def run_turn(session_id, user_text, reply, finished=False):
+    """The database calls respond() makes for one turn."""
+    session = database.get_session(session_id, fields=TURN_FIELDS)
+    with database.SessionTurn(session_id, message_count=session.get("message_count")) as turn:
+        turn.add_message("user", user_text)
+        turn.add_message("assistant", reply)
+        if finished:
+            turn.save_summary("summary", "low")
+
+
+def test_turn_costs_two_round_trips(repo):
+    before = repo.round_trips
+    run_turn("s1", "hello", "hi there")
+    assert repo.round_trips - before == 2
+
+
+def test_finishing_turn_costs_two_round_trips(repo):
+    run_turn("s1", "hello", "hi there")
+    before = repo.round_trips
+    run_turn("s1", "bye", "take care", finished=True)
+    assert repo.round_trips - before == 2
+    session = database.get_session("s1")
+    assert (session["summary"], session["risk"], session["message_count"]) == ("summary", "low", 5)
+
+
+def test_messages_keep_their_order(repo):
+    run_turn("s1", "one", "two")
+    run_turn("s1", "three", "four")
+    messages = database.get_session_messages("s1")
+    assert [m["seq"] for m in messages] == [0, 1, 2, 3, 4]
+    assert [m["text"] for m in messages] == ["Hi", "one", "two", "three", "four"]
+
+
+def test_stale_count_falls_back_to_reserving_seqs(repo):
+    session = database.get_session("s1", fields=TURN_FIELDS)
+    database.add_message("s1", "user", "sent from another worker")
+    before = repo.round_trips
+    with database.SessionTurn("s1", message_count=session["message_count"]) as turn:
+        turn.add_message("user", "hello")
+    # the rejected one-trip write, then reserve + bucket write
+    assert repo.round_trips - before == 3
+    messages = database.get_session_messages("s1")
+    assert [m["seq"] for m in messages] == [0, 1, 2]
+    assert messages[-1]["text"] == "hello"
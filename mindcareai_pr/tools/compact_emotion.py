@@ -0,0 +1,115 @@
+# tools/compact_emotion.py
+"""
+Pure-NumPy scorer for the emotion model exported by
+ml_model/export_compact_model.py (emotion_model.npz).
+
+Reproduces Pipeline(TfidfVectorizer -> soft VotingClassifier(LogisticRegression,
+CalibratedClassifierCV(LinearSVC))).predict_proba without sklearn:
+
+  * vocabulary: sorted UTF-8 byte strings, looked up with np.searchsorted
+    (no 75k-entry Python dict)
+  * weights: one (n_features, n_rows) matrix holding every linear model's
+    coefficients side by side, so a text costs one row-gather + one matvec
+
+Exposes the same duck-typed surface emotion_tool uses: classes_ and
+predict_proba(texts).
+"""
+import re
+import json
+import numpy as np
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class CompactEmotionModel:
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self.terms = data["terms"]
+            self.idf = data["idf"]
+            self.weights = data["weights"]
+            self.intercepts = data["intercepts"]
+            self.classes_ = data["classes"].astype(object)
+            spec = json.loads(str(data["spec"]))
+        self.version = spec.get("version")
+        self.min_n, self.max_n = spec["ngram_range"]
+        self.lowercase = spec["lowercase"]
+        self.sublinear_tf = spec["sublinear_tf"]
+        self.norm = spec["norm"]
+        self.members = spec["members"]
+        self.member_weights = spec["member_weights"]
+        self._token_re = re.compile(spec["token_pattern"])
+
+    # --- TF-IDF ---
+    def _ngrams(self, text):
+        tokens = self._token_re.findall(text.lower() if self.lowercase else text)
+        grams = []
+        for n in range(self.min_n, self.max_n + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _vectorize(self, text):
+        """(feature indices, tf-idf values) of one text; indices sorted, unique."""
+        grams = self._ngrams(text)
+        if not grams:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        keys = np.array([g.encode("utf-8") for g in grams])
+        pos = np.searchsorted(self.terms, keys)
+        pos[pos == len(self.terms)] = 0
+        idx, counts = np.unique(pos[self.terms[pos] == keys], return_counts=True)
+        values = counts.astype(float)
+        if self.sublinear_tf:
+            values = 1.0 + np.log(values)
+        values *= self.idf[idx]
+        if self.norm == "l2" and values.size:
+            values /= np.sqrt(values @ values)
+        return idx, values
+
+    def decision_rows(self, texts):
+        """Raw linear scores of every member model: (n_texts, n_rows)."""
+        out = np.tile(self.intercepts, (len(texts), 1))
+        for i, text in enumerate(texts):
+            idx, values = self._vectorize(text)
+            if idx.size:
+                out[i] += values @ self.weights[idx]
+        return out
+
+    # --- Probabilities ---
+    def _member_proba(self, member, scores):
+        kind = member["kind"]
+        if kind == "softmax":
+            start, end = member["rows"]
+            return _softmax(scores[:, start:end].copy())
+        if kind == "ovr":
+            start, end = member["rows"]
+            proba = _expit(scores[:, start:end])
+            return proba / proba.sum(axis=1, keepdims=True)
+        if kind == "calibrated":
+            folds = []
+            n_classes = len(self.classes_)
+            for fold in member["folds"]:
+                start, end = fold["rows"]
+                a, b = np.asarray(fold["a"]), np.asarray(fold["b"])
+                proba = _expit(-(a * scores[:, start:end] + b))
+                denom = proba.sum(axis=1, keepdims=True)
+                proba = np.divide(proba, denom, out=np.full_like(proba, 1 / n_classes), where=denom != 0)
+                proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+                folds.append(proba)
+            return np.mean(folds, axis=0)
+        raise ValueError(f"Unknown member kind {kind!r}")
+
+    def predict_proba(self, texts):
+        scores = self.decision_rows([str(t) for t in texts])
+        probas = [self._member_proba(m, scores) for m in self.members]
+        return np.average(probas, axis=0, weights=self.member_weights)
+
+    def predict(self, texts):
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
@@ -1,42 +1,203 @@
 # tools/emotion_tool.py
 """
 Inference wrapper for our saved emotion model.
-Exposes: predict_emotion(text) -> dict with keys: emotion, polarity, risk, confidence
+Exposes:
+  predict_emotions(texts) -> dict of per-text arrays: emotion, polarity, risk, confidence
+  predict_emotion(text)   -> dict with keys: emotion, polarity, risk, confidence
+
+EMOTION_ENGINE selects the scorer:
+  sklearn  (default) the pickled Pipeline, emotion_model.pkl
+  compact  the pure-NumPy export, emotion_model.npz (see ml_model/export_compact_model.py)
+
+Model source: the active version of the model registry (ml_model/registry.py)
+when one has been published, otherwise the files directly in ml_model/.
+Every MODEL_CHECK_INTERVAL_SECONDS a request checks whether the registry
+manifest (or the legacy file) changed; the new model is then loaded in a
+background thread while requests keep using the old one, and swapped in
+with a single reference assignment.
 """
 
 import os
 import json
+import time
+import threading
 from pathlib import Path
+from typing import NamedTuple, Any
 import joblib
 import math
+import numpy as np
+
+from tools.text_cache import memoize_text, text_cache
+from ml_model.preprocessing import clean_texts
+from ml_model import registry
 
 BASE = Path(__file__).resolve().parents[1] / "ml_model"
 MODEL_PATH = BASE / "emotion_model.pkl"
+COMPACT_MODEL_PATH = BASE / "emotion_model.npz"
 LABEL_MAP_PATH = BASE / "label_map.json"
 
-# Lazy load
-_pipeline = None
-_label_map = None
+EMOTION_ENGINE = os.getenv("EMOTION_ENGINE", "sklearn").lower()
+# How often (at most) to look for a new model version
+MODEL_CHECK_INTERVAL_SECONDS = float(os.getenv("MODEL_CHECK_INTERVAL_SECONDS", 5))
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: Any        # sklearn Pipeline or CompactEmotionModel
+    label_map: dict
+
+
+# Lazy load; _active is only ever replaced whole, so readers need no lock
+_active = None
+_load_lock = threading.Lock()
+_reloading = False
+_failed_version = None
+_last_check = 0.0
+
+def _fingerprint(path):
+    stat = path.stat()
+    return f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+def _version_source(version, directory):
+    artifact = "emotion_model.npz" if EMOTION_ENGINE == "compact" else "emotion_model.pkl"
+    if EMOTION_ENGINE == "compact" and not (directory / artifact).exists():
+        raise FileNotFoundError(
+            f"Model version {version} has no compact export ({artifact}). Publish a TF-IDF model "
+            "with train_emotion_model.py --publish, or serve it with EMOTION_ENGINE=sklearn."
+        )
+    return version, directory / artifact, directory / "label_map.json"
+
+def _resolve_source():
+    """(version, model file, label map file) the worker should be serving."""
+    current = registry.current_version()
+    if current is not None:
+        return _version_source(*current)
+    path = COMPACT_MODEL_PATH if EMOTION_ENGINE == "compact" else MODEL_PATH
+    if not path.exists():
+        hint = "ml_model/export_compact_model.py" if EMOTION_ENGINE == "compact" else "ml_model/train_emotion_model.py"
+        raise FileNotFoundError(f"Model not found at {path}. Run {hint} first.")
+    return _fingerprint(path), path, LABEL_MAP_PATH
+
+def _load_model(version, model_path, label_map_path):
+    if EMOTION_ENGINE == "compact":
+        from tools.compact_emotion import CompactEmotionModel
+        model = CompactEmotionModel(model_path)
+    else:
+        model = joblib.load(model_path)
+    if not hasattr(model, "predict_proba"):
+        # e.g. the old hard-voting ensemble: predictions without confidences
+        raise RuntimeError(
+            f"Model at {model_path} has no predict_proba. "
+            "Retrain with ml_model/train_emotion_model.py to get a calibrated soft-voting model."
+        )
+    if Path(label_map_path).exists():
+        with open(label_map_path, "r", encoding="utf-8") as f:
+            label_map = json.load(f)
+    else:
+        label_map = {"polarity_map": {}, "risk_map": {}}
+    return LoadedModel(version, model, label_map)
 
 def _load():
-    global _pipeline, _label_map
-    if _pipeline is None:
-        if not MODEL_PATH.exists():
-            raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Run ml_model/train_emotion_model.py first.")
-        _pipeline = joblib.load(MODEL_PATH)
-    if _label_map is None:
-        if LABEL_MAP_PATH.exists():
-            with open(LABEL_MAP_PATH, "r", encoding="utf-8") as f:
-                _label_map = json.load(f)
-        else:
-            _label_map = {"polarity_map": {}, "risk_map": {}}
-    return _pipeline, _label_map
+    """The active model, loading it synchronously on first use."""
+    global _active
+    if _active is None:
+        with _load_lock:
+            if _active is None:
+                _active = _load_model(*_resolve_source())
+                print(f"🧠 Emotion model {_active.version} loaded")
+    return _active
+
+def _reload_in_background(source):
+    global _active, _reloading, _failed_version
+    try:
+        loaded = _load_model(*source)
+        # Warm the new model before it takes traffic
+        loaded.model.predict_proba(["warmup"])
+        _active = loaded
+        text_cache.invalidate_namespace("emotion")
+        print(f"🔄 Emotion model swapped to {loaded.version}")
+    except Exception as e:
+        _failed_version = source[0]
+        print(f"⚠️  Could not load emotion model {source[0]}, keeping {_active.version}: {e}")
+    finally:
+        _reloading = False
+
+def _check_for_new_model():
+    """Start a background swap if a different model version is available."""
+    global _last_check, _reloading
+    now = time.monotonic()
+    if _active is None or _reloading or now - _last_check < MODEL_CHECK_INTERVAL_SECONDS:
+        return
+    _last_check = now
+    try:
+        source = _resolve_source()
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Model source check failed, keeping {_active.version}: {e}")
+        return
+    if source[0] in (_active.version, _failed_version):
+        return
+    with _load_lock:
+        if _reloading:
+            return
+        _reloading = True
+    threading.Thread(target=_reload_in_background, args=(source,), name="emotion-model-reload", daemon=True).start()
 
 def _map_polarity_and_risk(emotion: str, label_map: dict):
     polarity = label_map.get("polarity_map", {}).get(emotion, "neutral")
     risk = label_map.get("risk_map", {}).get(emotion, "low")
     return polarity, risk
 
+def predict_emotions(texts):
+    """
+    Batch version of predict_emotion: texts are cleaned exactly as in
+    training (ml_model/preprocessing.py), then go through the vectorizer in
+    one sparse transform and the classifier in one call.
+
+    Returns parallel NumPy arrays, one entry per input text:
+    {
+      "emotion":    array(["sadness", "joy", ...]),
+      "polarity":   array(["negative", "positive", ...]),
+      "risk":       array(["high", "low", ...]),
+      "confidence": array([0.87, 0.64, ...])
+    }
+    """
+    _check_for_new_model()
+    active = _load()
+    pipeline, label_map = active.model, active.label_map
+    texts = clean_texts(texts)
+    if not texts:
+        empty = np.array([], dtype=object)
+        return {"emotion": empty, "polarity": empty, "risk": empty, "confidence": np.array([], dtype=float)}
+
+    # One transform + one probability pass over the whole batch;
+    # the label is its argmax (_load guarantees predict_proba)
+    probs = pipeline.predict_proba(texts)
+    pred_idx = probs.argmax(axis=1)
+    emotions = np.asarray(pipeline.classes_)[pred_idx]
+    confidence = probs[np.arange(len(texts)), pred_idx].astype(float)
+
+    # Map each distinct label once instead of once per text
+    classes, inverse = np.unique(emotions.astype(str), return_inverse=True)
+    mapped = [_map_polarity_and_risk(c, label_map) for c in classes]
+    polarity = np.array([p for p, _ in mapped], dtype=object)[inverse]
+    risk = np.array([r for _, r in mapped], dtype=object)[inverse]
+
+    return {
+        "emotion": classes.astype(object)[inverse],
+        "polarity": polarity,
+        "risk": risk,
+        "confidence": confidence,
+    }
+
+def model_version():
+    """
+    Version of the model in use: the registry version, or a fingerprint of
+    the legacy artifact file. Also triggers the periodic new-model check.
+    """
+    _check_for_new_model()
+    return _load().version
+
+@memoize_text("emotion", version=model_version)
 def predict_emotion(text: str):
     """
     Returns:
@@ -47,27 +208,12 @@ def predict_emotion(text: str):
       "confidence": 0.87
     }
     """
-    pipeline, label_map = _load()
-
-    # pipeline.predict_proba is available if classifier supports it.
-    # We attempt to call predict_proba; if not present, fallback to 1.0 confidence.
-    try:
-        probs = pipeline.predict_proba([text])[0]
-        pred_idx = int(probs.argmax())
-        labels = pipeline.classes_
-        emotion = labels[pred_idx]
-        confidence = float(probs[pred_idx])
-    except Exception:
-        # fallback
-        emotion = pipeline.predict([text])[0]
-        confidence = 1.0
-
-    polarity, risk = _map_polarity_and_risk(emotion, label_map)
+    result = predict_emotions([text])
     return {
-        "emotion": str(emotion),
-        "polarity": str(polarity),
-        "risk": str(risk),
-        "confidence": float(confidence)
+        "emotion": str(result["emotion"][0]),
+        "polarity": str(result["polarity"][0]),
+        "risk": str(result["risk"][0]),
+        "confidence": float(result["confidence"][0])
     }
 
 # convenience alias
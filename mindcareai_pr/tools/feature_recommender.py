@@ -5,6 +5,8 @@ Tool to recommend MindWell platform features based on user conversation context.
 from typing import List, Dict, Any
 import re
 
+from tools.text_features import analyze_text, recent_topics, TOPIC_KEYWORDS
+
 # MindWell platform features mapping
 MINDWELL_FEATURES = {
     "anxiety": {
@@ -205,7 +207,8 @@ MINDWELL_FEATURES = {
     }
 }
 
-def recommend_features(user_text: str, emotion_data: Dict[str, Any] = None, conversation_context: str = "") -> List[Dict[str, Any]]:
+def recommend_features(user_text: str, emotion_data: Dict[str, Any] = None, conversation_context: str = "",
+                       text_features: Dict[str, Any] = None, session_signals: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """
     Recommend MindWell platform features based on user's conversation and emotional state.
     
@@ -213,41 +216,23 @@ def recommend_features(user_text: str, emotion_data: Dict[str, Any] = None, conv
         user_text: Current user message
         emotion_data: Emotion analysis results
         conversation_context: Previous conversation context
+        text_features: analyze_text() result for user_text, if the caller has it
+        session_signals: per-session counters (text_features.update_session_signals);
+            when given, topics come from them and conversation_context isn't scanned
         
     Returns:
         List of feature recommendations
     """
     recommendations = []
-    text_lower = (user_text or "").lower()
-    context_lower = (conversation_context or "").lower()
-    combined_text = f"{text_lower} {context_lower}"
-    
-    # Detect keywords to determine which features to recommend
-    detected_topics = []
-    
-    # Anxiety-related
-    if any(keyword in combined_text for keyword in ["anxious", "anxiety", "worried", "worry", "panic", "nervous", "overwhelmed"]):
-        detected_topics.append("anxiety")
-    
-    # Stress-related
-    if any(keyword in combined_text for keyword in ["stress", "stressed", "pressure", "overwhelmed", "exams", "work", "deadline"]):
-        detected_topics.append("stress")
-    
-    # Sadness-related
-    if any(keyword in combined_text for keyword in ["sad", "depressed", "down", "hopeless", "unhappy", "miserable"]):
-        detected_topics.append("sad")
-    
-    # Sleep-related
-    if any(keyword in combined_text for keyword in ["sleep", "insomnia", "tired", "exhausted", "can't sleep", "restless"]):
-        detected_topics.append("sleep")
-    
-    # Loneliness-related
-    if any(keyword in combined_text for keyword in ["lonely", "alone", "isolated", "no one", "nobody", "friend"]):
-        detected_topics.append("lonely")
     
-    # Anger-related
-    if any(keyword in combined_text for keyword in ["angry", "mad", "furious", "irritated", "frustrated", "annoyed"]):
-        detected_topics.append("angry")
+    # Keyword topics (anxiety, stress, sad, sleep, lonely, angry) found in the
+    # recent messages, in TOPIC_KEYWORDS order
+    if session_signals is not None:
+        detected_topics = recent_topics(session_signals)
+    else:
+        text_topics = (text_features or analyze_text(user_text))["topics"]
+        context_topics = analyze_text(conversation_context)["topics"]
+        detected_topics = [topic for topic in TOPIC_KEYWORDS if topic in text_topics or topic in context_topics]
     
     # Also check emotion data
     if emotion_data:
@@ -0,0 +1,226 @@
+# tools/keyword_matcher.py
+"""
+Multi-pattern keyword matcher (Aho-Corasick over word tokens).
+
+All keyword sets (risk, personal/conversation questions, knowledge, help
+indicators, recommender topics) are compiled once into one automaton. A
+message is tokenized once and walked once; find() returns every category
+with the keywords that occur in it, including overlapping ones ("harm
+myself" is both a risk phrase and contains the help indicator "harm").
+
+Matching is by whole words, so "help" no longer fires on "helpful" and
+"mad" not on "made". "self-harm" and "self harm" tokenize the same. A
+trailing "*" makes a keyword's last word a prefix ("stress*" matches
+"stressed", "stressful"); the keyword lists use it sparingly and spell out
+the inflections that matter instead ("harming", "helpless").
+
+Benchmark against the substring checks, show where they differ, and check
+the safety categories (risk, professional): every RECALL_PHRASES message
+must still be flagged wherever substring matching flagged it, and no
+PRECISION_PHRASES message may be (exits 1 otherwise):
+    python tools/keyword_matcher.py [--texts ml_model/data/isear.csv]
+"""
+import re
+from collections import Counter, deque
+from typing import Dict, Iterable, List
+
+# Words keep inner apostrophes ("can't", "what's"); ’ is folded to ' first
+TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+
+
+def tokenize(text: str, lowered: bool = False) -> List[str]:
+    """Word tokens of text; lowered=True skips lowercasing text that already is."""
+    text = text or ""
+    return TOKEN_RE.findall((text if lowered else text.lower()).replace("’", "'"))
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton whose alphabet is words instead of characters."""
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self._goto = [{}]       # state -> {word: state}
+        self._stems = [[]]      # state -> [(stem, outputs)] for prefix last words
+        self._out = [[]]        # state -> [(category, keyword)]
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                words = tokenize(keyword.rstrip("*"))
+                if words:
+                    self._add(words, keyword.endswith("*"), (category, keyword.rstrip("*")))
+        self._build_failure_links()
+
+    def _new_state(self):
+        self._goto.append({})
+        self._stems.append([])
+        self._out.append([])
+        return len(self._goto) - 1
+
+    def _add(self, words, prefix, output):
+        state = 0
+        for word in words[:-1]:
+            state = self._goto[state].get(word) or self._goto[state].setdefault(word, self._new_state())
+        if prefix:
+            self._stems[state].append((words[-1], output))
+        else:
+            last = self._goto[state].get(words[-1]) or self._goto[state].setdefault(words[-1], self._new_state())
+            self._out[last].append(output)
+
+    def _build_failure_links(self):
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                # A state also reports every keyword its failure state reports
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        # Prefix stems that can complete a keyword from each state (its own
+        # and its failure chain's), indexed by their first letters so a word
+        # is only compared with stems it could start with
+        stems = [stem for per_state in self._stems for stem, _ in per_state]
+        self._stem_key = min((len(stem) for stem in stems), default=1)
+        self._stem_index = []
+        for state in range(len(self._goto)):
+            index, s = {}, state
+            while True:
+                for stem, output in self._stems[s]:
+                    index.setdefault(stem[:self._stem_key], []).append((stem, output))
+                if s == 0:
+                    break
+                s = self._fail[s]
+            self._stem_index.append(index)
+
+    def find(self, text: str) -> Dict[str, List[str]]:
+        """{category: [keywords in order of first occurrence]} for one linear pass over text."""
+        return self.find_tokens(tokenize(text))
+
+    def find_tokens(self, tokens: Iterable[str]) -> Dict[str, List[str]]:
+        """find() over already tokenized text (see tokenize)."""
+        hits: Dict[str, List[str]] = {}
+
+        def emit(outputs):
+            for category, keyword in outputs:
+                found = hits.setdefault(category, [])
+                if keyword not in found:
+                    found.append(keyword)
+
+        goto, fail, out, stem_index, key = self._goto, self._fail, self._out, self._stem_index, self._stem_key
+        state = 0
+        for word in tokens:
+            candidates = stem_index[state].get(word[:key])
+            if candidates:
+                for stem, output in candidates:
+                    if word.startswith(stem):
+                        emit((output,))
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if out[state]:
+                emit(out[state])
+        return hits
+
+
+# =========================
+# Benchmark
+# =========================
+SAFETY_CATEGORIES = ("risk", "professional")
+
+# Risk / help-seeking messages the old substring checks flagged, including
+# inflections; the automaton must flag the same safety categories
+RECALL_PHRASES = [
+    "I feel helpless and I am harming myself",
+    "I harmed myself again last night",
+    "I've been self-harming",
+    "harmful thoughts keep coming",
+    "I feel so helpless",
+    "should I talk to professionals",
+    "my psychotherapist said it's normal",
+    "my counselors don't listen",
+    "the doctors can't do anything",
+    "I have no supportive people",
+    "there were suicides in my family",
+    "I keep having suicidal thoughts",
+    "this is an emergency",
+    "I'm struggling with everything",
+    "I can't cope anymore",
+    "I don't know what to do",
+    "I need help",
+    "I am in crisis",
+    "I want to kill myself",
+    "I want to die",
+    "no reason to live anymore",
+]
+
+# Harmless messages the substring checks misread; no safety category may fire
+PRECISION_PHRASES = [
+    "that was really helpful, thanks",
+    "harmony is nice",
+    "what a charming evening",
+    "I picked it up at the pharmacy",
+    "I want to diet before summer",
+    "the film was harmless fun",
+]
+
+
+def _substring_scan(text):
+    from tools import text_features
+    lower = text.lower()
+    return {name: [kw for kw in keywords if kw.rstrip("*") in lower]
+            for name, keywords in text_features.KEYWORD_SETS.items()}
+
+
+def _safety_check(matcher):
+    """True if the automaton flags every safety hit substring matching found on
+    RECALL_PHRASES and none on PRECISION_PHRASES."""
+    missed = []
+    for phrase in RECALL_PHRASES:
+        old = {name for name, hits in _substring_scan(phrase).items() if hits and name in SAFETY_CATEGORIES}
+        missed += [(phrase, name) for name in sorted(old - set(matcher.find(phrase)))]
+    false_hits = [(phrase, name) for phrase in PRECISION_PHRASES
+                  for name in SAFETY_CATEGORIES if name in matcher.find(phrase)]
+    print(f"🛟 Safety recall on {len(RECALL_PHRASES)} phrases: {len(missed)} substring-only hits")
+    for phrase, name in missed:
+        print(f"   missed {name}: {phrase!r}")
+    print(f"🛟 Safety precision on {len(PRECISION_PHRASES)} phrases: {len(false_hits)} false hits")
+    for phrase, name in false_hits:
+        print(f"   false {name}: {phrase!r}")
+    return not missed and not false_hits
+
+
+def _benchmark(texts, repeat=3):
+    from tools import text_features
+    from ml_model.bench_utils import time_per_message
+
+    substring_scan = _substring_scan
+    matcher = text_features.MATCHER
+    changed = [t for t in texts if {k: bool(v) for k, v in substring_scan(t).items() if v}
+               != {k: True for k in matcher.find(t)}]
+    print(f"🔎 Category hits differing from substring matching: {len(changed)}/{len(texts)} messages")
+    for text in changed[:5]:
+        old = {k for k, v in substring_scan(text).items() if v}
+        new = set(matcher.find(text))
+        print(f"   {text[:70]!r}: substring-only {sorted(old - new)}, word-only {sorted(new - old)}")
+    safety = Counter(name for t in texts for name, hits in substring_scan(t).items()
+                     if hits and name in SAFETY_CATEGORIES and name not in matcher.find(t))
+    print(f"🛟 Safety categories only substring matching fired on: {dict(safety) or 'none'}")
+
+    for name, fn in (("substring", substring_scan), ("automaton", matcher.find)):
+        time_per_message(name, lambda: [fn(t) for t in texts], len(texts), repeat, width=9)
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from tools import text_features
+    from ml_model.bench_utils import texts_parser, load_texts
+
+    args = texts_parser("Benchmark the keyword automaton against substring checks").parse_args()
+    _benchmark(load_texts(args.texts))
+    if not _safety_check(text_features.MATCHER):
+        sys.exit(1)
@@ -0,0 +1,239 @@
+# tools/lexicon_sentiment.py
+"""
+Lexicon sentiment scorer, a fast drop-in for TextBlob's default
+(PatternAnalyzer) polarity/subjectivity.
+
+TextBlob builds a blob, runs pattern's sentence tokenizer and walks a nested
+{word: {pos: [p, s, i]}} lexicon for every message. Here the same lexicon
+(TextBlob's bundled en-sentiment.xml, including its derived "-ly" adverbs)
+is flattened once into {word: (polarity, subjectivity, intensity, is_adverb)}
+and messages go through a single-pass tokenizer and the same assessment
+rules:
+  * intensifiers ("very good"): a known adverb multiplies the next word's scores
+  * negation ("not good"): the assessment's polarity is multiplied by -0.5
+  * "!" boosts the previous assessment's polarity by 1.25; "(!)" marks irony
+  * emoticons score as mood words
+
+Polarity and subjectivity are the mean over all assessments, exactly as in
+TextBlob, and the tokenizer reproduces pattern's splitting (emoticons,
+"(!)", abbreviations, ellipses), so scores are identical to TextBlob's (see
+the agreement report below). That includes its quirks: contractions are
+split on the apostrophe, so "don't" is not treated as a negation.
+
+The lexicon and the emoticon/abbreviation tables are TextBlob internals
+(textblob._text, textblob.en.sentiment), so requirements.txt pins the
+TextBlob version the agreement report was run against (0.20.1). If they
+can't be read, every call falls back to TextBlob(text).sentiment.
+
+Agreement report and benchmark against TextBlob:
+    python tools/lexicon_sentiment.py [--texts ml_model/data/isear.csv]
+"""
+import re
+import threading
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+
+# pattern.en's contraction splitting and quote spacing, in the same order
+CONTRACTION_RE = re.compile(r"('d|'m|'s|'ll|'re|'ve|n't)")
+QUOTES = str.maketrans({q: f" {q} " for q in "“”‘’'\""})
+LEADING_PUNCT_RE = re.compile(r"^[%s]+" % re.escape(PUNCTUATION.replace(".", "")))
+TRAILING_PUNCT = tuple(PUNCTUATION)
+
+_lock = threading.Lock()
+_lexicon = None    # word -> (polarity, subjectivity, intensity, is_adverb)
+_emoticons = None  # lowercased emoticon -> polarity
+_merge = None      # (hint regex, sarcasm regex, emoticon regex) from pattern
+_is_abbreviation = None
+_unavailable = None  # why the lexicon couldn't be compiled (then TextBlob is used)
+
+
+def _compile():
+    """Flatten TextBlob's sentiment lexicon once per process; (None, None) if that fails."""
+    global _lexicon, _emoticons, _merge, _is_abbreviation, _unavailable
+    if _lexicon is None and _unavailable is None:
+        with _lock:
+            if _lexicon is None and _unavailable is None:
+                try:
+                    from textblob.en import sentiment as pattern_sentiment
+                    from textblob._text import EMOTICONS, RE_EMOTICONS, RE_SARCASM
+                    from textblob._text import ABBREVIATIONS, RE_ABBR1, RE_ABBR2, RE_ABBR3
+
+                    if dict.__len__(pattern_sentiment) == 0:
+                        pattern_sentiment.load()
+                    lexicon = {}
+                    for word, by_pos in dict.items(pattern_sentiment):
+                        p, s, i = by_pos[None]
+                        lexicon[word] = (p, s, i, "RB" in by_pos)
+                    emoticons = {e.lower(): p for (_, p), faces in EMOTICONS.items() for e in faces}
+                    # Only messages containing one of these characters can hold an
+                    # emoticon or "(!)", so the rest skip the merge regexes
+                    marks = {c for faces in EMOTICONS.values() for e in faces for c in e if not c.isalnum()}
+                    merge = (re.compile("[%s]" % re.escape("".join(marks | {"!"}))), RE_SARCASM, RE_EMOTICONS)
+                except Exception as e:
+                    # A TextBlob version with a different internal layout
+                    _unavailable = f"{type(e).__name__}: {e}"
+                    print(f"⚠️  Lexicon sentiment unavailable, falling back to TextBlob: {_unavailable}")
+                    return None, None
+                _emoticons, _merge = emoticons, merge
+                _is_abbreviation = lambda t: (t in ABBREVIATIONS or RE_ABBR1.match(t) or RE_ABBR2.match(t)
+                                              or RE_ABBR3.match(t)) is not None
+                _lexicon = lexicon
+    return _lexicon, _emoticons
+
+
+def _textblob_scores(text):
+    from textblob import TextBlob
+    sentiment = TextBlob(text).sentiment
+    return sentiment.polarity, sentiment.subjectivity
+
+
+def _split_trailing(chunk):
+    """
+    Peel trailing punctuation off a chunk like pattern does: "..." stays one
+    token and abbreviations ("Mr.", "U.S.") keep their period. Both matter
+    for scoring because 3+ character tokens end a pending intensifier.
+    """
+    tail = []
+    while chunk.endswith(TRAILING_PUNCT):
+        if chunk[-1] != ".":
+            tail.append(chunk[-1])
+            chunk = chunk[:-1]
+        elif chunk.endswith("..."):
+            tail.append("...")
+            chunk = chunk[:-3].rstrip(".")
+        elif _is_abbreviation(chunk):
+            break
+        else:
+            tail.append(".")
+            chunk = chunk[:-1]
+    return chunk, tail[::-1]
+
+
+def tokenize(text):
+    """Lowercased tokens, split the way pattern's find_tokens splits them."""
+    if _compile()[0] is None:
+        raise RuntimeError(f"Lexicon sentiment unavailable: {_unavailable}")
+    text = CONTRACTION_RE.sub(r" \1", str(text)).translate(QUOTES)
+    tokens = []
+    for chunk in text.split():
+        lead = LEADING_PUNCT_RE.match(chunk)
+        if lead:
+            tokens.extend(lead.group())
+            chunk = chunk[lead.end():]
+        if chunk.endswith(TRAILING_PUNCT):
+            chunk, tail = _split_trailing(chunk)
+            if chunk:
+                tokens.append(chunk)
+            tokens.extend(tail)
+        elif chunk:
+            tokens.append(chunk)
+
+    hint, sarcasm, emoticons = _merge
+    if hint.search(text):
+        # Re-join emoticons and "(!)" that punctuation splitting broke apart
+        joined = sarcasm.sub("(!)", " ".join(tokens))
+        tokens = emoticons.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined).split()
+    return [t.lower() for t in tokens]
+
+
+def _assess(tokens, lexicon, emoticons):
+    """pattern's Sentiment.assessments over one token list -> [[p, s, i, negated], ...]."""
+    a = []
+    m = None  # preceding modifier word
+    n = None  # preceding negation
+    for w in tokens:
+        entry = lexicon.get(w)
+        if entry is not None:
+            p, s, i, is_adverb = entry
+            if m is None:
+                a.append([p, s, i, False])
+            else:
+                last = a[-1]
+                last[0] = max(-1.0, min(p * last[2], 1.0))
+                last[1] = max(-1.0, min(s * last[2], 1.0))
+                last[2] = i
+            if n is not None:
+                a[-1][2] = 1.0 / a[-1][2]
+                a[-1][3] = True
+            m = w if is_adverb else None
+            n = w if w in NEGATIONS else None
+            continue
+
+        if w in NEGATIONS:
+            n = w
+        elif n and len(w.strip("'")) > 1:
+            n = None
+        if n is not None and m is not None and m.endswith("ly"):
+            a[-1][3] = True
+            n = None
+        elif m and len(w) > 2:
+            m = None
+        if w == "!" and a:
+            a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, 1.0))
+        if w == "(!)":
+            a.append([0.0, 1.0, 1.0, False])
+        if not w.isalpha() and len(w) <= 5 and w not in PUNCTUATION:
+            p = emoticons.get(w)
+            if p is not None:
+                a.append([p, 1.0, 1.0, False])
+    return a
+
+
+def polarity_subjectivity(text):
+    """(polarity in [-1, 1], subjectivity in [0, 1]) of one message."""
+    lexicon, emoticons = _compile()
+    if lexicon is None:
+        return _textblob_scores(text)
+    a = _assess(tokenize(text), lexicon, emoticons)
+    if not a:
+        return 0.0, 0.0
+    polarity = sum(p * -0.5 if negated else p for p, _, _, negated in a) / len(a)
+    subjectivity = sum(s for _, s, _, _ in a) / len(a)
+    return polarity, subjectivity
+
+
+def polarity_subjectivity_batch(texts):
+    """Batch API: list of (polarity, subjectivity), one per text."""
+    return [polarity_subjectivity(t) for t in texts]
+
+
+# =========================
+# Agreement report / benchmark
+# =========================
+def _label(polarity):
+    return "positive" if polarity > 0.1 else "negative" if polarity < -0.1 else "neutral"
+
+
+def _report(texts, repeat=3):
+    from ml_model.bench_utils import time_per_message
+    reference = [_textblob_scores(t) for t in texts]
+    ours = polarity_subjectivity_batch(texts)
+    dp = [abs(a[0] - b[0]) for a, b in zip(ours, reference)]
+    ds = [abs(a[1] - b[1]) for a, b in zip(ours, reference)]
+    exact = sum(x < 1e-9 and y < 1e-9 for x, y in zip(dp, ds))
+    labels = sum(_label(a[0]) == _label(b[0]) for a, b in zip(ours, reference))
+    n = len(texts)
+    print(f"🔎 Agreement with TextBlob on {n} messages:")
+    print(f"   identical scores:    {exact}/{n} ({exact / n:.2%})")
+    print(f"   same label (±0.1):   {labels}/{n} ({labels / n:.2%})")
+    print(f"   |Δpolarity|:         mean {sum(dp) / n:.5f}, max {max(dp):.4f}")
+    print(f"   |Δsubjectivity|:     mean {sum(ds) / n:.5f}, max {max(ds):.4f}")
+    worst = sorted(range(n), key=lambda k: -dp[k])[:3]
+    for k in worst:
+        if dp[k] > 1e-9:
+            print(f"   e.g. {texts[k][:70]!r}: {ours[k][0]:.3f} vs {reference[k][0]:.3f}")
+
+    time_per_message("textblob", lambda: [_textblob_scores(t) for t in texts], n, repeat)
+    time_per_message("lexicon", lambda: polarity_subjectivity_batch(texts), n, repeat)
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from ml_model.bench_utils import texts_parser, load_texts
+
+    args = texts_parser("Compare the lexicon sentiment scorer with TextBlob").parse_args()
+    _report(load_texts(args.texts))
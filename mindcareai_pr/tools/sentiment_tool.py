@@ -1,28 +1,62 @@
+# tools/sentiment_tool.py
+"""
+Sentiment polarity / subjectivity of user messages.
+
+SENTIMENT_ENGINE selects the scorer:
+  lexicon   (default) tools/lexicon_sentiment.py, TextBlob's lexicon and rules
+            without building a TextBlob per message (same scores)
+  textblob  TextBlob(text).sentiment
+"""
+import os
+from importlib.metadata import version as _package_version
 from textblob import TextBlob
 
+from tools.text_cache import memoize_text
+from tools import lexicon_sentiment
+
+TEXTBLOB_VERSION = _package_version("textblob")
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "lexicon").lower()
+
+
+def _label(polarity):
+    if polarity > 0.1:
+        return "positive"
+    elif polarity < -0.1:
+        return "negative"
+    return "neutral"
+
+
+def _scores(text):
+    if SENTIMENT_ENGINE == "textblob":
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+    return lexicon_sentiment.polarity_subjectivity(text)
+
+
+@memoize_text("sentiment", version=lambda: f"{SENTIMENT_ENGINE}-{TEXTBLOB_VERSION}")
 def analyze_sentiment(text: str) -> dict:
     """
-    Perform sentiment polarity classification using TextBlob.
+    Perform sentiment polarity classification.
+    Results are memoized per normalized text (see tools/text_cache.py).
 
     Args:
         text (str): Input text.
 
     Returns:
-        dict: Sentiment polarity (-1 to 1) and label.
+        dict: Sentiment polarity (-1 to 1), subjectivity (0 to 1) and label.
     """
-    analysis = TextBlob(text)
-    polarity = analysis.sentiment.polarity
-    subjectivity = analysis.sentiment.subjectivity  # how subjective the text is
-
-    if polarity > 0.1:
-        label = "positive"
-    elif polarity < -0.1:
-        label = "negative"
-    else:
-        label = "neutral"
-
+    polarity, subjectivity = _scores(text)  # subjectivity: how subjective the text is
     return {
         "polarity": polarity,
         "subjectivity": subjectivity,
-        "label": label
+        "label": _label(polarity)
     }
+
+
+def analyze_sentiments(texts) -> list:
+    """Batch version of analyze_sentiment (uncached): one result dict per text."""
+    if SENTIMENT_ENGINE == "textblob":
+        scores = [_scores(t) for t in texts]
+    else:
+        scores = lexicon_sentiment.polarity_subjectivity_batch(texts)
+    return [{"polarity": p, "subjectivity": s, "label": _label(p)} for p, s in scores]
@@ -0,0 +1,228 @@
+# tools/shadow_eval.py
+"""
+Shadow evaluation of candidate emotion models.
+
+node_emotion hands every served emotion result to submit(); a sample of
+them is re-scored by each candidate model (published-but-inactive registry
+versions) in a separate, lower-priority worker process, off the request
+path. Scoring there never holds this process's GIL, so request threads
+don't wait on it. Per candidate we record agreement with what the serving
+model answered and the latency of both models on the same cleaned text,
+served at /stats/shadow.
+
+submit() only does a random draw and a queue put, and drops samples when the
+worker falls behind, so it never blocks /session/respond.
+
+    SHADOW_MODEL_VERSIONS   comma-separated registry versions to shadow (empty disables)
+    SHADOW_SAMPLE_RATE      fraction of messages to shadow (default 0.1)
+    SHADOW_MAX_WORKERS      worker processes (default 1)
+    SHADOW_MAX_PENDING      queued samples before new ones are dropped (default 256)
+    SHADOW_NICE             niceness added to the worker processes (default 10)
+"""
+import os
+import time
+import random
+import threading
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tools import emotion_tool
+from ml_model import registry
+from ml_model.preprocessing import clean_text
+
+SHADOW_MODEL_VERSIONS = [v.strip() for v in os.getenv("SHADOW_MODEL_VERSIONS", "").split(",") if v.strip()]
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", 0.1))
+SHADOW_MAX_WORKERS = int(os.getenv("SHADOW_MAX_WORKERS", 1))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", 256))
+SHADOW_NICE = int(os.getenv("SHADOW_NICE", 10))
+
+# Latency samples kept per candidate for the percentiles
+LATENCY_WINDOW = 1000
+
+_executor = None
+_lock = threading.Lock()
+_pending = 0
+_dropped = 0
+_stats = {}        # version -> _CandidateStats
+_unavailable = {}  # version -> load error message
+
+# Worker process state: version -> LoadedModel, or the load error message
+_candidates = {}
+
+
+class _CandidateStats:
+    def __init__(self):
+        self.samples = 0
+        self.emotion_agree = 0
+        self.risk_agree = 0
+        self.confidence_delta = 0.0
+        self.disagreements = Counter()   # (served, candidate) emotion pairs
+        self.serving_ms = deque(maxlen=LATENCY_WINDOW)
+        self.candidate_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def summary(self):
+        def pct(samples, p):
+            return round(float(np.percentile(samples, p)), 3) if samples else None
+
+        n = self.samples
+        return {
+            "samples": n,
+            "emotion_agreement": round(self.emotion_agree / n, 4) if n else None,
+            "risk_agreement": round(self.risk_agree / n, 4) if n else None,
+            "mean_confidence_delta": round(self.confidence_delta / n, 4) if n else None,
+            "latency_ms": {
+                "serving_p50": pct(self.serving_ms, 50),
+                "candidate_p50": pct(self.candidate_ms, 50),
+                "serving_p95": pct(self.serving_ms, 95),
+                "candidate_p95": pct(self.candidate_ms, 95),
+            },
+            "top_disagreements": [
+                {"served": s, "candidate": c, "count": k} for (s, c), k in self.disagreements.most_common(5)
+            ],
+        }
+
+
+def enabled():
+    return bool(SHADOW_MODEL_VERSIONS) and SHADOW_SAMPLE_RATE > 0
+
+
+# --- Worker process ---
+def _init_worker():
+    try:
+        os.nice(SHADOW_NICE)  # leave the CPU to the serving process first
+    except (AttributeError, OSError):
+        pass
+
+
+def _candidate(version):
+    """Load a candidate once (in the worker process); None if it can't be used."""
+    loaded = _candidates.get(version)
+    if loaded is None:
+        try:
+            source = emotion_tool._version_source(version, registry.version_dir(version))
+            loaded = emotion_tool._load_model(*source)
+            print(f"👥 Shadow emotion model {version} loaded")
+        except Exception as e:
+            loaded = str(e)
+            print(f"⚠️  Shadow emotion model {version} unavailable: {e}")
+        _candidates[version] = loaded
+    return None if isinstance(loaded, str) else loaded
+
+
+def _score(loaded, cleaned):
+    start = time.perf_counter()
+    probs = loaded.model.predict_proba([cleaned])[0]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    idx = int(probs.argmax())
+    emotion = str(loaded.model.classes_[idx])
+    _, risk = emotion_tool._map_polarity_and_risk(emotion, loaded.label_map)
+    return emotion, risk, float(probs[idx]), elapsed_ms
+
+
+def _evaluate(text):
+    """
+    Runs in the worker: score text with the serving model and every
+    candidate. Returns ({version: (emotion, risk, confidence, candidate_ms,
+    serving_ms)}, {version: load error}).
+    """
+    cleaned = clean_text(text)
+    emotion_tool._check_for_new_model()
+    serving = emotion_tool._load()
+    # Time the serving model here too, so both latencies are measured on
+    # the same input and process (the request itself may have been a cache hit)
+    _, _, _, serving_ms = _score(serving, cleaned)
+    results = {}
+    for version in SHADOW_MODEL_VERSIONS:
+        if version == serving.version:
+            continue
+        loaded = _candidate(version)
+        if loaded is not None:
+            results[version] = _score(loaded, cleaned) + (serving_ms,)
+    errors = {v: err for v, err in _candidates.items() if isinstance(err, str)}
+    return results, errors
+
+
+# --- Serving process ---
+def _record(served, future):
+    global _pending
+    try:
+        if future.cancelled():  # dropped by reset()
+            return
+        results, errors = future.result()
+        with _lock:
+            _unavailable.update(errors)
+            for version, (emotion, risk, confidence, candidate_ms, serving_ms) in results.items():
+                stats = _stats.setdefault(version, _CandidateStats())
+                stats.samples += 1
+                stats.emotion_agree += emotion == served.get("emotion")
+                stats.risk_agree += risk == served.get("risk")
+                stats.confidence_delta += confidence - float(served.get("confidence", 0.0))
+                if emotion != served.get("emotion"):
+                    stats.disagreements[(served.get("emotion"), emotion)] += 1
+                stats.serving_ms.append(serving_ms)
+                stats.candidate_ms.append(candidate_ms)
+    except Exception as e:
+        print(f"⚠️  Shadow evaluation failed: {e}")
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def submit(text, served):
+    """
+    Queue a shadow comparison of `served` (the result analyze_emotion
+    returned for `text`). Fire-and-forget: returns immediately.
+    """
+    global _executor, _pending, _dropped
+    if not enabled() or random.random() >= SHADOW_SAMPLE_RATE:
+        return
+    with _lock:
+        if _pending >= SHADOW_MAX_PENDING:
+            _dropped += 1
+            return
+        _pending += 1
+        if _executor is None:
+            # spawn, not fork: the serving process has threads (and models) of its own
+            _executor = ProcessPoolExecutor(max_workers=SHADOW_MAX_WORKERS, initializer=_init_worker,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        executor = _executor
+    served = dict(served)
+    try:
+        future = executor.submit(_evaluate, text)
+    except Exception as e:
+        # e.g. the worker died (BrokenProcessPool): start a fresh one next time
+        print(f"⚠️  Shadow evaluation failed: {e}")
+        with _lock:
+            _pending -= 1
+            if _executor is executor:
+                _executor = None
+        return
+    future.add_done_callback(lambda f: _record(served, f))
+
+
+def stats():
+    with _lock:
+        return {
+            "enabled": enabled(),
+            "sample_rate": SHADOW_SAMPLE_RATE,
+            "serving_version": emotion_tool._active.version if emotion_tool._active else None,
+            "pending": _pending,
+            "dropped": _dropped,
+            "candidates": {version: s.summary() for version, s in _stats.items()},
+            "unavailable": dict(_unavailable),
+        }
+
+
+def reset():
+    """Clear collected statistics and restart the worker (e.g. after changing candidates)."""
+    global _dropped, _executor
+    with _lock:
+        _stats.clear()
+        _unavailable.clear()
+        _dropped = 0
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
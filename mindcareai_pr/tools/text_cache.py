@@ -0,0 +1,103 @@
+# tools/text_cache.py
+"""
+Bounded LRU memoization shared by the text-analysis tools.
+
+Short replies ("ok", "I'm fine", "not good", "yes") recur constantly, so
+analyze_emotion / analyze_sentiment results are cached per worker, keyed on
+(tool, model version, normalized text). A new model version simply stops
+matching old keys, and the tool drops its stale entries when it notices
+the change.
+
+    TEXT_CACHE_MAX_ENTRIES   max cached results across all tools (default 4096, 0 disables)
+"""
+import os
+import threading
+import functools
+import unicodedata
+from collections import OrderedDict
+
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", 4096))
+
+
+def normalize_text(text: str) -> str:
+    """Cache-key form of a message: NFC, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).casefold().split())
+
+
+class LRUCache:
+    """Thread-safe LRU cache with hit/miss counters."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate_namespace(self, namespace):
+        """Drop every entry of one tool (keys are (namespace, version, text))."""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == namespace]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+text_cache = LRUCache(TEXT_CACHE_MAX_ENTRIES)
+
+
+def memoize_text(namespace, version):
+    """
+    Decorator for single-text tools returning a flat dict. `version` is a
+    zero-arg callable naming the model that would compute the result.
+    The tool runs on the normalized text, so equal keys mean equal results;
+    callers get a copy they are free to mutate. Callers that already hold
+    normalize_text(text) pass it with normalized=True to skip re-normalizing.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(text, normalized=False):
+            normalized = text if normalized else normalize_text(text)
+            key = (namespace, version(), normalized)
+            result = text_cache.get(key)
+            if result is None:
+                result = fn(normalized)
+                text_cache.set(key, result)
+            return dict(result)
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
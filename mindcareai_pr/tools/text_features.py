@@ -0,0 +1,160 @@
+# tools/text_features.py
+"""
+Single-pass text analysis shared by the per-turn graph nodes.
+
+node_analyze_text runs analyze_text() once on the user's message and stores
+the result in AgentState["text_features"]; node_risk_check, the router, the
+empathetic reply and the feature recommender read their flags from it
+instead of each lowercasing and re-scanning the text. The same function
+analyzes the recent conversation context once per reply.
+
+All keyword lists below are compiled into one word-level automaton
+(tools/keyword_matcher.py) and matched as whole words; "*" marks a stem
+whose inflections count too ("stress*" -> "stressful").
+
+The text is normalized once (the text_cache key form); the keyword scan
+tokenizes that form, and node_sentiment / node_emotion hand it to the
+memoized tools with normalized=True instead of re-normalizing the raw text.
+
+The result is a plain dict of str / bool / list values, so it is stored by
+the LangGraph checkpointer like the rest of the state:
+{
+  "normalized": "i can't sleep and feel so alone",   # text_cache key form
+  "risk_keywords": [],
+  "risk": "low",
+  "conversation_question": False,   # asks about something said earlier ("my name")
+  "personal_question": False,       # ... or about themselves ("my mood", "my job")
+  "knowledge_query": False,         # "what is", "explain", ...
+  "professional": False,            # asks for / signals need of professional help
+  "topics": ["sleep", "lonely"],    # feature_recommender topics, in MINDWELL_FEATURES order
+  "end_command": False,             # "end" / "stop" / ...
+}
+"""
+from typing import Any, Dict, Optional
+
+from tools.text_cache import normalize_text
+from tools.keyword_matcher import KeywordMatcher, tokenize
+
+# Inflections are listed as whole words; "*" stems are kept to roots no
+# harmless word starts with ("suicide*", "self harm*"), never "die*" (diet)
+RISK_KEYWORDS = [
+    "suicide*", "kill myself", "killing myself", "end my life", "ending my life",
+    "want to die", "wanted to die", "wanting to die",
+    "hurt myself", "hurting myself", "no reason to live", "cut myself", "cutting myself",
+    "self harm*", "self-harm", "harm myself", "harming myself", "harmed myself",
+    "die by suicide", "suicidal"
+]
+
+# Questions about the conversation itself (empathetic_reply answers from context)
+CONVERSATION_QUESTIONS = [
+    "my name", "what's my name", "what is my name", "do you know my name",
+    "remember me", "do you remember", "what did i say", "what did i tell you"
+]
+
+# Personal questions route to the normal reply rather than a knowledge lookup
+PERSONAL_QUESTIONS = CONVERSATION_QUESTIONS + [
+    "my age", "my job", "my work", "my family", "my friends",
+    "how am i feeling", "what am i feeling", "my mood", "my emotions"
+]
+
+KNOWLEDGE_KEYWORDS = ["what is", "explain", "research", "study", "who is", "information"]
+
+# Whole words only, so "helpful" and "harmony" don't count; the inflections
+# that do signal a need for help are listed explicitly
+PROFESSIONAL_INDICATORS = [
+    "therapist", "therapists", "psychotherapist", "psychotherapists",
+    "counselor", "counselors", "counsellor", "counsellors", "doctor", "doctors", "doctor's",
+    "professional", "professionals", "help", "helpless", "helplessly", "helplessness",
+    "support", "supportive", "can't cope", "struggling", "need help", "don't know what to do",
+    "suicidal", "harm", "harming", "harmed", "harmful", "crisis", "emergency"
+]
+
+# feature_recommender topics, in the order their features are recommended
+TOPIC_KEYWORDS = {
+    "anxiety": ["anxious", "anxiety", "worried", "worry*", "panic*", "nervous", "overwhelmed"],
+    "stress": ["stress*", "stressed", "pressure*", "overwhelmed", "exams", "work", "deadline*"],
+    "sad": ["sad", "depressed", "down", "hopeless", "unhappy", "miserable"],
+    "sleep": ["sleep*", "insomnia", "tired", "exhausted", "can't sleep", "restless"],
+    "lonely": ["lonely", "alone", "isolated", "no one", "nobody", "friend*"],
+    "angry": ["angry", "mad", "furious", "irritated", "frustrated", "annoyed"],
+}
+
+END_COMMANDS = {"end", "finish", "stop", "done"}
+
+# Session signals cover this many recent user messages (the reply context
+# used to be the last 10 messages, about 5 of them from the user)
+SIGNAL_WINDOW = 5
+
+KEYWORD_SETS = {
+    "risk": RISK_KEYWORDS,
+    "conversation_question": CONVERSATION_QUESTIONS,
+    "personal_question": PERSONAL_QUESTIONS,
+    "knowledge": KNOWLEDGE_KEYWORDS,
+    "professional": PROFESSIONAL_INDICATORS,
+    **{f"topic:{topic}": keywords for topic, keywords in TOPIC_KEYWORDS.items()},
+}
+
+MATCHER = KeywordMatcher(KEYWORD_SETS)
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """Normalize the text once and compute every keyword flag the nodes use."""
+    normalized = normalize_text(text or "")
+    # normalize_text already case-folds, so the tokens need no second lowercasing
+    hits = MATCHER.find_tokens(tokenize(normalized, lowered=True))
+    risk_keywords = hits.get("risk", [])
+    return {
+        "normalized": normalized,
+        "risk_keywords": risk_keywords,
+        "risk": "high" if risk_keywords else "low",
+        "conversation_question": "conversation_question" in hits,
+        "personal_question": "personal_question" in hits,
+        "knowledge_query": "knowledge" in hits,
+        "professional": "professional" in hits,
+        "topics": [topic for topic in TOPIC_KEYWORDS if f"topic:{topic}" in hits],
+        "end_command": normalized in END_COMMANDS,
+    }
+
+
+def _signal_categories(features: Dict[str, Any]):
+    categories = [f"topic:{topic}" for topic in features["topics"]]
+    if features["risk_keywords"]:
+        categories.append("risk")
+    if features["professional"]:
+        categories.append("professional")
+    return categories
+
+
+def update_session_signals(signals: Optional[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold the newest user message's features into the per-session counters
+    (AgentState["session_signals"]), without rescanning older messages:
+    {
+      "window": [["topic:sleep"], [], ["topic:sad", "risk"]],  # last SIGNAL_WINDOW user messages
+      "counts": {"topic:sleep": 1, "topic:sad": 1, "risk": 1}, # hits inside the window
+      "totals": {"topic:sleep": 3, "topic:sad": 1, "risk": 1}, # hits over the whole session
+      "messages": 12,
+    }
+    Returns a new dict; the old one is left untouched.
+    """
+    signals = signals or {"window": [], "counts": {}, "totals": {}, "messages": 0}
+    window = [list(hit) for hit in signals["window"]]
+    counts, totals = dict(signals["counts"]), dict(signals["totals"])
+
+    newest = _signal_categories(features)
+    window.append(newest)
+    for category in newest:
+        counts[category] = counts.get(category, 0) + 1
+        totals[category] = totals.get(category, 0) + 1
+    if len(window) > SIGNAL_WINDOW:
+        for category in window.pop(0):
+            counts[category] -= 1
+            if not counts[category]:
+                del counts[category]
+    return {"window": window, "counts": counts, "totals": totals, "messages": signals["messages"] + 1}
+
+
+def recent_topics(signals: Dict[str, Any]):
+    """Topics seen in the signal window, in TOPIC_KEYWORDS order."""
+    counts = signals["counts"]
+    return [topic for topic in TOPIC_KEYWORDS if f"topic:{topic}" in counts]
@@ -0,0 +1,146 @@
+# warmup.py
+"""
+Startup warmup + readiness state.
+
+Everything that used to initialize on the first user request (the emotion
+pipeline unpickle, TextBlob's lexicon, the Wikipedia client, the compiled
+LangGraph's node code paths) is exercised once in a background thread at
+startup. /ready (see main.py) reports 503 until that finishes, so a load
+balancer only routes traffic to warm workers; /health stays a pure liveness
+check.
+
+    WARMUP_ON_STARTUP=false  skip warmup; the service reports ready at once
+    WARMUP_WIKIPEDIA=false   skip the (network) Wikipedia warmup call
+"""
+import os
+import time
+import threading
+from datetime import datetime
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() not in ("0", "false", "no")
+WARMUP_WIKIPEDIA = os.getenv("WARMUP_WIKIPEDIA", "true").lower() not in ("0", "false", "no")
+
+WARMUP_TEXT = "I feel a bit anxious about work today but I am okay."
+
+_lock = threading.Lock()
+_thread = None
+_status = {
+    "state": "pending",      # pending -> running -> done
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "steps": {},             # name -> {"ok": bool, "ms": float, "required": bool, "error": str?}
+}
+
+
+# --- Steps ---
+def _warm_emotion_model():
+    from tools.emotion_tool import predict_emotions
+    predict_emotions([WARMUP_TEXT, "ok"])
+
+
+def _warm_sentiment():
+    from tools.sentiment_tool import analyze_sentiment
+    analyze_sentiment(WARMUP_TEXT)
+
+
+def _warm_feature_recommender():
+    from tools.feature_recommender import recommend_features
+    recommend_features(WARMUP_TEXT, {"emotion": "fear", "risk": "medium"})
+
+
+def _warm_wikipedia():
+    from tools.wikipedia_tool import search_wikipedia
+    search_wikipedia("Mindfulness", sentences=1)
+
+
+def _warm_graph():
+    """
+    Run the model-backed, LLM-free nodes on a throwaway state and touch the
+    checkpointer, so the first real turn doesn't pay for their first call.
+    The Groq LLM is never called here.
+    """
+    import agent_graph
+    state = {
+        "user_id": "warmup",
+        "session_id": "warmup",
+        "language": "en",
+        "input_text": WARMUP_TEXT,
+        "messages": [],
+        "risk": "low",
+        "text_features": None,
+        "session_signals": None,
+        "sentiment": None,
+        "emotion": None,
+        "facial_emotion": None,
+        "reply": None,
+        "question": None,
+        "summary": None,
+        "done": False,
+        "recommendations": None,
+    }
+    for node in (agent_graph.node_analyze_text, agent_graph.node_risk_check,
+                 agent_graph.node_sentiment, agent_graph.node_emotion):
+        state = node(state)
+    agent_graph.route_after_risk(state)
+    agent_graph.GRAPH.get_state({"configurable": {"thread_id": "warmup"}})
+
+
+# (name, fn, required) — a failed required step keeps the service not-ready
+STEPS = [
+    ("emotion_model", _warm_emotion_model, True),
+    ("sentiment", _warm_sentiment, True),
+    ("feature_recommender", _warm_feature_recommender, True),
+    ("graph", _warm_graph, True),
+]
+if WARMUP_WIKIPEDIA:
+    STEPS.append(("wikipedia", _warm_wikipedia, False))
+
+
+# --- Runner ---
+def run_warmup():
+    """Run every warmup step (blocking) and update the readiness state."""
+    with _lock:
+        _status.update(state="running", ready=False, started_at=datetime.utcnow().isoformat(), steps={})
+    print("🔥 Warmup started...")
+
+    for name, fn, required in STEPS:
+        start = time.perf_counter()
+        step = {"required": required}
+        try:
+            fn()
+            step["ok"] = True
+        except Exception as e:
+            step["ok"] = False
+            step["error"] = str(e)
+        step["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        with _lock:
+            _status["steps"][name] = step
+        icon = "✅" if step["ok"] else ("❌" if required else "⚠️ ")
+        print(f"   {icon} {name}: {step['ms']} ms" + (f" ({step['error']})" if not step["ok"] else ""))
+
+    with _lock:
+        ready = all(s["ok"] for s in _status["steps"].values() if s["required"])
+        _status.update(state="done", ready=ready, finished_at=datetime.utcnow().isoformat())
+    print(f"🔥 Warmup finished — {'ready' if ready else 'NOT ready (required step failed)'}")
+    return ready
+
+
+def start_warmup():
+    """Kick off warmup in a daemon thread (idempotent). Called from the startup hook."""
+    global _thread
+    if not WARMUP_ON_STARTUP:
+        with _lock:
+            _status.update(state="skipped", ready=True)
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+    _thread.start()
+
+
+def readiness():
+    """Snapshot of the warmup state for /ready."""
+    with _lock:
+        return {**_status, "steps": {k: dict(v) for k, v in _status["steps"].items()}}